@@ -1,70 +1,141 @@
 import os
-import boto3
+import sys
 import polars as pl
-from dotenv import load_dotenv
-from botocore.exceptions import ClientError
-import time 
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
 
-load_dotenv()
+# Client de stockage partagé du pipeline (S3/R2 ou local, voir scraping_lois/storage.py).
+# Ses réglages de transfert (multipart au-delà de 16 Mo) conviennent aux PDFs.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraping_lois"))
+from storage import get_storage, ObjectNotFound
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PDF_LOCAL = os.path.join(BASE_DIR, "db_local_pdfs") 
-DB_TEMP_PATH = os.path.join(BASE_DIR, "db_urls.parquet.tmp") 
+DB_PDF_LOCAL = os.path.join(BASE_DIR, "db_local_pdfs")
+DB_TEMP_PATH = os.path.join(BASE_DIR, "db_urls.parquet.tmp")
 DB_FILENAME = "db_urls.parquet"
+PDF_PREFIX = "pdfs/"
 
-BUCKET_NAME = os.getenv("BUCKET_NAME")
-ENDPOINT_URL = os.getenv("R2_ENDPOINT_URL")
-ACCESS_KEY = os.getenv("R2_ACCESS_KEY_ID")
-SECRET_KEY = os.getenv("R2_SECRET_ACCESS_KEY")
+MAX_WORKERS = 16
 
-s3 = boto3.client(
-    's3',
-    endpoint_url=ENDPOINT_URL,
-    aws_access_key_id=ACCESS_KEY,
-    aws_secret_access_key=SECRET_KEY
-)
+storage = get_storage()
+
+# ----------------------------
+#  Index distant (taille + ETag)
+# ----------------------------
+def list_remote_objects(prefix=PDF_PREFIX):
+    """
+    Retourne {clé: objet listé} via le listing paginé : un appel pour 1000
+    fichiers au lieu d'un HEAD par fichier. L'ETag n'est lu qu'au besoin
+    (calculé à la demande par le stockage local).
+    """
+    return {obj["key"]: obj for obj in storage.list(prefix)}
+
+
+def local_md5(path):
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_up_to_date(local_path, size, etag, check_etag):
+    if not os.path.exists(local_path):
+        return False
+    if os.path.getsize(local_path) != size:
+        return False
+    # Les ETags multipart ("...-N") ne sont pas des MD5 : la taille fait foi.
+    if check_etag and etag and "-" not in etag:
+        return local_md5(local_path) == etag
+    return True
+
+# ----------------------------
+#  Téléchargement d'un fichier
+# ----------------------------
+def download_one(cloud_key, local_path):
+    tmp_path = local_path + ".part"
+    storage.download_file(cloud_key, tmp_path)
+    os.replace(tmp_path, local_path)
+    return os.path.getsize(local_path)
+
+
+def download_pdfs_guided_by_db(check_etag=False, max_workers=MAX_WORKERS):
 
-def download_pdfs_guided_by_db():
-    
     if not os.path.exists(DB_PDF_LOCAL):
         os.makedirs(DB_PDF_LOCAL, exist_ok=True)
         print(f"Création du dossier local : {DB_PDF_LOCAL}")
 
     total_downloaded = 0
     total_skipped = 0
-    
+    bytes_downloaded = 0
+    bytes_saved = 0
+    errors = []
+
     try:
         print("1. 📥 Téléchargement de la DB pour obtenir l'index des fichiers...")
-        s3.download_file(BUCKET_NAME, DB_FILENAME, DB_TEMP_PATH)
+        storage.download_file(DB_FILENAME, DB_TEMP_PATH)
         df = pl.read_parquet(DB_TEMP_PATH)
-        
+
         print("2. ⚙️ Préparation de l'index des clés cloud...")
         cloud_keys = (
             df.filter(pl.col("downloaded") == True)
-              .select(pl.concat_str([pl.lit("pdfs/"), pl.col("pdf_name")]).alias("cloud_key"))
+              .select(pl.concat_str([pl.lit(PDF_PREFIX), pl.col("pdf_name")]).alias("cloud_key"))
               .get_column("cloud_key")
               .to_list()
         )
-        
-        print(f"   {len(cloud_keys)} fichiers à télécharger trouvés dans l'index.")
-        
-        print("\n3. ⬇️ Démarrage du téléchargement")
+        remote = list_remote_objects()
 
+        print(f"   {len(cloud_keys)} fichiers référencés dans l'index, {len(remote)} présents sur le Cloud.")
+
+        to_download = []
         for cloud_key in cloud_keys:
-            filename = os.path.basename(cloud_key)
-            local_path = os.path.join(DB_PDF_LOCAL, filename)
-                
-            s3.download_file(BUCKET_NAME, cloud_key, local_path)
-            print(f"   [OK] {filename}")
-            total_downloaded += 1
+            local_path = os.path.join(DB_PDF_LOCAL, os.path.basename(cloud_key))
+            if cloud_key not in remote:
+                errors.append((cloud_key, "absent du Cloud"))
+                continue
+            size = remote[cloud_key]["size"]
+            etag = remote[cloud_key]["etag"].strip('"') if check_etag else None
+            if is_up_to_date(local_path, size, etag, check_etag):
+                total_skipped += 1
+                bytes_saved += size
+            else:
+                to_download.append((cloud_key, local_path))
+
+        print(f"   {total_skipped} fichiers déjà à jour, {len(to_download)} à télécharger.")
+        print("\n3. ⬇️ Démarrage du téléchargement")
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(download_one, cloud_key, local_path): cloud_key
+                for cloud_key, local_path in to_download
+            }
+            for future in as_completed(futures):
+                cloud_key = futures[future]
+                filename = os.path.basename(cloud_key)
+                try:
+                    bytes_downloaded += future.result()
+                    total_downloaded += 1
+                    print(f"   [OK] {filename}")
+                except Exception as e:
+                    errors.append((cloud_key, str(e)))
+                    print(f"   [ERREUR] {filename} : {e}")
+        elapsed = time.time() - start
+        throughput = bytes_downloaded / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
 
         print("\n" + "="*50)
-        print("✅ TÉLÉCHARGEMENT GUIDÉ RÉUSSI.")
-        print(f"   Fichiers téléchargés : {total_downloaded}")
-        print(f"   Fichiers sautés : {total_skipped}")
+        print("✅ SYNCHRONISATION TERMINÉE." if not errors else "⚠️ SYNCHRONISATION TERMINÉE AVEC ERREURS.")
+        print(f"   Fichiers téléchargés : {total_downloaded} ({bytes_downloaded / (1024 * 1024):.1f} Mo)")
+        print(f"   Fichiers sautés : {total_skipped} ({bytes_saved / (1024 * 1024):.1f} Mo économisés)")
+        print(f"   Débit : {throughput:.2f} Mo/s en {elapsed:.1f}s")
+        print(f"   Erreurs : {len(errors)}")
+        for cloud_key, error in errors:
+            print(f"     - {cloud_key} : {error}")
         print("="*50)
-        
-    except ClientError as e:
+
+    except ObjectNotFound as e:
         print(f"\n❌ ERREUR CRITIQUE D'ACCÈS : {e}")
         print("Vérifie l'accès au bucket ou la présence de 'db_urls.parquet'.")
     except Exception as e:
@@ -73,5 +144,18 @@ def download_pdfs_guided_by_db():
         if os.path.exists(DB_TEMP_PATH):
             os.remove(DB_TEMP_PATH)
 
+    return {
+        "downloaded": total_downloaded,
+        "skipped": total_skipped,
+        "bytes_downloaded": bytes_downloaded,
+        "bytes_saved": bytes_saved,
+        "errors": errors,
+    }
+
 if __name__ == "__main__":
-    download_pdfs_guided_by_db()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Miroir local des PDFs du bucket.")
+    parser.add_argument("--check-etag", action="store_true",
+                        help="Compare aussi le MD5 local à l'ETag (plus lent, détecte les fichiers modifiés à taille égale)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+    download_pdfs_guided_by_db(check_etag=args.check_etag, max_workers=args.workers)
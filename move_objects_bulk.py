@@ -0,0 +1,243 @@
+"""
+Déplacement / copie en masse d'objets dans le bucket.
+
+Remplace one_shot_move_pdf.py. Exemple (réorganisation des logs) :
+
+    python move_objects_bulk.py \
+        --src-prefix pdfs-assemblee-nationale/logs/ \
+        --dst-prefix pdfs-assemblee-nationale/logs/pipeline_scraping_pdf_main/ \
+        --pattern "pipeline_*.log" --no-recursive --dry-run
+
+Passe par scraping_lois/storage.py : STORAGE_BACKEND=local pour essayer sur
+un dossier local.
+"""
+import os
+import sys
+import json
+import time
+import fnmatch
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Client de stockage partagé du pipeline (S3/R2 ou local, voir scraping_lois/storage.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraping_lois"))
+from storage import get_storage, DELETE_BATCH_SIZE
+
+MAX_WORKERS = 16
+
+storage = get_storage()
+
+# ----------------------------
+#  Sélection des objets
+# ----------------------------
+def list_keys(prefix, pattern=None, recursive=True):
+    """
+    Liste toutes les clés sous un préfixe (pagination complète).
+    `pattern` est un glob appliqué au nom de fichier (ex: "pipeline_*.log").
+    """
+    for obj in storage.list(prefix):
+        key = obj["key"]
+        if key.endswith("/"):
+            continue
+        relative = key[len(prefix):]
+        if not recursive and "/" in relative:
+            continue
+        if pattern and not fnmatch.fnmatch(os.path.basename(key), pattern):
+            continue
+        yield key
+
+
+def destination_key(key, src_prefix, dst_prefix):
+    return dst_prefix + key[len(src_prefix):]
+
+# ----------------------------
+#  Suivi de progression (reprise)
+# ----------------------------
+# Un journal par couple bucket / source → destination : son nom par défaut en
+# dérive, et sa première ligne l'enregistre pour refuser une reprise avec
+# d'autres préfixes.
+
+def default_progress_path(bucket, src_prefix, dst_prefix):
+    digest = hashlib.sha256(f"{bucket}\0{src_prefix}\0{dst_prefix}".encode()).hexdigest()[:12]
+    return f"move_objects_progress.{digest}.jsonl"
+
+
+def progress_header(bucket, src_prefix, dst_prefix):
+    return {"bucket": bucket, "src_prefix": src_prefix, "dst_prefix": dst_prefix}
+
+
+def load_progress(progress_path, header):
+    """
+    Relit le journal de progression : {(clé source, clé destination): "copied" | "deleted"}.
+    Une copie n'est reprise que vers la même destination : un journal d'une
+    exécution vers un autre --dst-prefix ne fait jamais supprimer une source.
+    """
+    state = {}
+    if not progress_path or not os.path.exists(progress_path):
+        return state
+    with open(progress_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "src_prefix" in entry:
+                if entry != header:
+                    raise ValueError(
+                        f"{progress_path} suit {entry['bucket']}/{entry['src_prefix']} → {entry['dst_prefix']}, "
+                        f"pas {header['bucket']}/{header['src_prefix']} → {header['dst_prefix']}"
+                    )
+                continue
+            if "dst" not in entry:
+                continue  # ancien format (clé source seule) : destination inconnue, on recopie
+            state[(entry["key"], entry["dst"])] = entry["state"]
+    return state
+
+
+def open_progress(progress_path, header):
+    if not progress_path:
+        return None
+    progress_file = open(progress_path, "a", encoding="utf-8")
+    if progress_file.tell() == 0:
+        progress_file.write(json.dumps(header) + "\n")
+        progress_file.flush()
+    return progress_file
+
+
+def record_progress(progress_file, pairs, state):
+    if progress_file is None:
+        return
+    for key, dst in pairs:
+        progress_file.write(json.dumps({"key": key, "dst": dst, "state": state}) + "\n")
+    progress_file.flush()
+
+# ----------------------------
+#  Copie & suppression
+# ----------------------------
+def copy_one(key, new_key):
+    storage.copy(key, new_key)
+    return key
+
+
+def move_objects(src_prefix, dst_prefix, pattern=None, recursive=True,
+                 keep_source=False, dry_run=False, progress_path=None,
+                 max_workers=MAX_WORKERS):
+    if src_prefix == dst_prefix:
+        raise ValueError("Le préfixe source et le préfixe destination sont identiques.")
+
+    start = time.time()
+    header = progress_header(storage.bucket, src_prefix, dst_prefix)
+    progress = load_progress(progress_path, header)
+
+    print(f"🔍 Listing de {storage.bucket}/{src_prefix} ...")
+    keys = [
+        k for k in list_keys(src_prefix, pattern, recursive)
+        # Évite de redéplacer ce qui est déjà sous la destination (dst dans src)
+        if not (dst_prefix.startswith(src_prefix) and k.startswith(dst_prefix))
+    ]
+    print(f"📊 {len(keys)} objets sélectionnés")
+
+    def dst(key):
+        return destination_key(key, src_prefix, dst_prefix)
+
+    to_copy = [k for k in keys if progress.get((k, dst(k))) not in ("copied", "deleted")]
+    already_copied = [k for k in keys if progress.get((k, dst(k))) == "copied"]
+    if progress:
+        print(f"↩️  Reprise : {len(keys) - len(to_copy)} objets déjà copiés")
+
+    if dry_run:
+        for key in to_copy:
+            print(f"   [DRY-RUN] {key} → {dst(key)}")
+        print(f"\n[DRY-RUN] {len(to_copy)} copies, "
+              f"{0 if keep_source else len(to_copy) + len(already_copied)} suppressions prévues.")
+        return {"copied": 0, "deleted": 0, "errors": 0}
+
+    copied = list(already_copied)
+    error_count = 0
+    progress_file = open_progress(progress_path, header)
+
+    try:
+        print("="*50)
+        print("🚀 Copie en parallèle...\n")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(copy_one, k, dst(k)): k
+                for k in to_copy
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    future.result()
+                    copied.append(key)
+                    record_progress(progress_file, [(key, dst(key))], "copied")
+                    print(f"✅ {key}")
+                except Exception as e:
+                    error_count += 1
+                    print(f"❌ {key} — Erreur: {e}")
+
+        deleted_count = 0
+        if not keep_source and copied:
+            print("\n🗑️  Suppression des sources par lots...")
+            for i in range(0, len(copied), DELETE_BATCH_SIZE):
+                batch = copied[i:i + DELETE_BATCH_SIZE]
+                try:
+                    failed = set(storage.delete_many(batch))
+                except Exception as e:
+                    print(f"❌ Lot {i // DELETE_BATCH_SIZE + 1} — Erreur: {e}")
+                    error_count += len(batch)
+                    continue
+                done = [k for k in batch if k not in failed]
+                record_progress(progress_file, [(k, dst(k)) for k in done], "deleted")
+                deleted_count += len(done)
+                error_count += len(failed)
+                print(f"   Lot {i // DELETE_BATCH_SIZE + 1} : {len(done)} supprimés, {len(failed)} erreurs")
+    finally:
+        if progress_file:
+            progress_file.close()
+
+    elapsed = time.time() - start
+    print("\n" + "="*50)
+    print("📊 RÉSUMÉ")
+    print("="*50)
+    print(f"✅ Copiés : {len(copied)}")
+    print(f"🗑️  Supprimés : {deleted_count}")
+    print(f"❌ Erreurs : {error_count}")
+    print(f"⏱️  Durée : {elapsed:.1f}s")
+    print("="*50)
+
+    return {"copied": len(copied), "deleted": deleted_count, "errors": error_count}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Déplacement / copie en masse d'objets du bucket.")
+    parser.add_argument("--src-prefix", required=True)
+    parser.add_argument("--dst-prefix", required=True)
+    parser.add_argument("--pattern", default=None, help="Glob sur le nom de fichier (ex: '*.log')")
+    parser.add_argument("--no-recursive", action="store_true", help="Ignore les sous-dossiers du préfixe source")
+    parser.add_argument("--copy", action="store_true", help="Copie sans supprimer la source")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--progress", default=None,
+                        help="Journal de progression pour reprendre après une interruption "
+                             "(défaut : move_objects_progress.<hash bucket/src/dst>.jsonl)")
+    parser.add_argument("--no-progress", action="store_true", help="Sans journal de progression")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.no_progress:
+        progress_path = None
+    else:
+        progress_path = args.progress or default_progress_path(storage.bucket, args.src_prefix, args.dst_prefix)
+    move_objects(
+        args.src_prefix,
+        args.dst_prefix,
+        pattern=args.pattern,
+        recursive=not args.no_recursive,
+        keep_source=args.copy,
+        dry_run=args.dry_run,
+        progress_path=progress_path,
+        max_workers=args.workers,
+    )
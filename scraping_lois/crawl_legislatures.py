@@ -0,0 +1,148 @@
+import json
+import argparse
+from datetime import datetime
+
+import polars as pl
+
+from db_store import storage, commit_db
+from db_updates import new_db_entries
+from storage import ObjectNotFound
+from doc_identity import with_doc_identity
+from legislatures import CURRENT_LEGISLATURE, is_frozen
+from scrap_urls_all import scrap_legislatures, MAX_PARALLEL_LEGISLATURES, SCRAPERS
+from opendata_ingest import ingest_archives, default_sources
+from url_canonical import canonical_frame, new_documents, update_aliases
+
+# ----------------------------
+#  Crawl multi-législatures
+# ----------------------------
+# Crawle plusieurs législatures en parallèle et ajoute les nouvelles URLs à la
+# DB (downloaded=False). Une législature figée (antérieure à la courante) dont
+# le crawl a abouti est marquée dans crawl_state/ et n'est plus recrawlée.
+# Les téléchargements se font ensuite par shard_runner.py (backfill).
+#
+# Les scrapers traitent toute erreur de pagination comme la dernière page : un
+# crawl interrompu ressemble à un crawl complet. L'état garde donc le nombre de
+# documents par catégorie, et la législature n'est pas figée si une catégorie
+# est vide ou en baisse par rapport à la DB ou au crawl précédent.
+
+STATE_PREFIX = "crawl_state/"
+
+
+def state_key(legislature):
+    return f"{STATE_PREFIX}legislature-{legislature}.json"
+
+
+def already_crawled(legislature):
+    return storage.head(state_key(legislature)) is not None
+
+
+def load_crawl_state(legislature):
+    try:
+        body, _ = storage.get(state_key(legislature))
+    except ObjectNotFound:
+        return None
+    return json.loads(body)
+
+
+def mark_crawled(legislature, n_urls, categories):
+    body = {"crawled_at": datetime.now().isoformat(), "urls": n_urls, "categories": categories}
+    storage.put(state_key(legislature), json.dumps(body).encode())
+
+
+def category_counts(docs_df, legislature):
+    """
+    Documents par catégorie (provenance) d'une législature.
+    """
+    counts = docs_df.filter(pl.col("legislature") == legislature).group_by("provenance").len()
+    return dict(zip(counts["provenance"].to_list(), counts["len"].to_list()))
+
+
+def freeze_problems(crawled, known, expected=()):
+    """
+    Raisons de ne pas figer la législature (liste vide si le crawl semble complet).
+    """
+    problems = [f"{prov} : aucun document" for prov in expected if not crawled.get(prov)]
+    problems += [
+        f"{prov} : {crawled.get(prov, 0)} documents, {n} déjà connus"
+        for prov, n in sorted(known.items()) if crawled.get(prov, 0) < n
+    ]
+    return problems
+
+
+def ingest_legislatures(legislatures, log=print):
+    scraped = {}
+    for leg in legislatures:
+        try:
+            scraped[leg] = ingest_archives(default_sources(leg))
+        except Exception as e:
+            log(f"[L{leg}] ❌ Ingestion open data échouée : {e}")
+    return scraped
+
+
+def crawl_legislatures(legislatures, force=False, max_parallel=MAX_PARALLEL_LEGISLATURES, log=print, opendata=False):
+    todo = []
+    for leg in legislatures:
+        if is_frozen(leg) and not force and already_crawled(leg):
+            log(f"[L{leg}] Législature figée déjà crawlée, ignorée (--force pour recrawler)")
+        else:
+            todo.append(leg)
+    if not todo:
+        return {}
+
+    if opendata:
+        log(f"Ingestion open data des législatures {todo}")
+        scraped = ingest_legislatures(todo, log)
+    else:
+        log(f"Crawl des législatures {todo} ({max_parallel} en parallèle)")
+        scraped = scrap_legislatures(todo, max_parallel)
+    if not scraped:
+        log("❌ Aucun crawl n'a abouti.")
+        return {}
+
+    new_df, aliases_df = canonical_frame(pl.concat([
+        pl.from_pandas(df).select(["url", "provenance"])
+        for df in scraped.values()
+    ]))
+    crawled_docs = with_doc_identity(new_df)
+    today = datetime.now().date().isoformat()
+    added = {}
+    known = {}
+
+    def add_new_urls(base_df):
+        fresh = new_documents(new_df, base_df)
+        added["count"] = len(fresh)
+        for leg in scraped:
+            known[leg] = category_counts(base_df, leg)
+        return pl.concat([base_df, new_db_entries(new_df, fresh, today)], how="vertical")
+
+    commit_db(add_new_urls, log)
+    log(f"✅ {added['count']} nouvelles URLs ajoutées à la DB")
+    update_aliases(aliases_df, log)
+
+    # L'open data ne couvre pas toutes les catégories du crawl Selenium.
+    expected = [] if opendata else [provenance for _, provenance, _, _ in SCRAPERS]
+    for leg, df in scraped.items():
+        if not is_frozen(leg):
+            continue
+        crawled = category_counts(crawled_docs, leg)
+        baseline = dict(known.get(leg, {}))
+        previous = load_crawl_state(leg) or {}
+        for prov, n in previous.get("categories", {}).items():
+            baseline[prov] = max(baseline.get(prov, 0), n)
+        problems = freeze_problems(crawled, baseline, expected)
+        if problems:
+            log(f"[L{leg}] ⚠️ Crawl incomplet, législature non figée : " + " ; ".join(problems))
+            continue
+        mark_crawled(leg, len(df), crawled)
+    return {leg: len(df) for leg, df in scraped.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl de plusieurs législatures en parallèle.")
+    parser.add_argument("legislatures", nargs="*", type=int, default=[CURRENT_LEGISLATURE])
+    parser.add_argument("--force", action="store_true", help="Recrawler aussi les législatures figées déjà faites")
+    parser.add_argument("--parallel", type=int, default=MAX_PARALLEL_LEGISLATURES)
+    parser.add_argument("--opendata", action="store_true", help="Lire les archives open data au lieu de crawler")
+    args = parser.parse_args()
+    crawl_legislatures(args.legislatures, args.force, args.parallel, opendata=args.opendata)
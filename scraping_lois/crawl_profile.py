@@ -0,0 +1,182 @@
+import os
+import time
+import tempfile
+import statistics
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+# ----------------------------
+#  Profil Chrome allégé pour les listings
+# ----------------------------
+# On ne lit que des attributs href : pas besoin d'images, de CSS, de polices
+# ni des scripts de mesure d'audience. Le chargement "eager" rend la main dès
+# que le DOM est prêt, sans attendre les sous-ressources.
+
+CSS_URL_PATTERNS = ["*.css"]
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*xiti.com*", "*atinternet*", "*matomo*", "*piwik*", "*hotjar*",
+    "*facebook.net*", "*twitter.com*", "*youtube.com*",
+]
+
+PROFILE_ROOT = os.path.join(tempfile.gettempdir(), "scraping_lois_chrome")
+WINDOW_SIZE = "1024,768"
+PAGE_TIMEOUT = 10
+
+
+def make_light_driver(profile_name="default", block_css=True):
+    """
+    Chrome headless allégé. `profile_name` sépare les user-data-dir quand
+    plusieurs navigateurs tournent en même temps (Chrome verrouille le profil).
+    `block_css=False` pour les pages où un scraper s'appuie sur is_displayed().
+    """
+    options = Options()
+    options.page_load_strategy = "eager"
+    options.add_argument("--headless=new")
+    options.add_argument(f"--window-size={WINDOW_SIZE}")
+    options.add_argument("--disable-infobars")
+    options.add_argument("--disable-notifications")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--no-first-run")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument(f"--user-data-dir={os.path.join(PROFILE_ROOT, profile_name)}")
+    prefs = {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.fonts": 2,
+    }
+    if block_css:
+        prefs["profile.managed_default_content_settings.stylesheets"] = 2
+    options.add_experimental_option("prefs", prefs)
+
+    driver = webdriver.Chrome(options=options)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {
+        "urls": BLOCKED_URL_PATTERNS + (CSS_URL_PATTERNS if block_css else [])
+    })
+    driver.crawl_metrics = CrawlMetrics(driver)
+    return driver
+
+# ----------------------------
+#  Mesures : temps de chargement par page et RSS du navigateur
+# ----------------------------
+# Le temps d'une page va du clic (navigation_started) jusqu'à ce que
+# l'élément témoin de l'ancienne page soit détaché du DOM puis que le contenu
+# attendu soit présent (page_loaded). Les deux fonctions encadrent le clic,
+# avant les time.sleep de politesse des scrapers, qui ne sont donc pas comptés.
+# Sans témoin (premier driver.get, bloquant), seul le contenu est attendu.
+def _process_tree_rss_kb(root_pid):
+    """
+    Somme des VmRSS (Ko) du processus et de ses descendants (Linux, /proc).
+    """
+    children = {}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(pid))
+        except (OSError, IndexError, ValueError):
+            continue
+
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class CrawlMetrics:
+    def __init__(self, driver):
+        self.driver = driver
+        self.page_times = []
+        self.rss_samples_kb = []
+        self._nav_start = None
+        self._marker = None
+
+    def navigation_started(self, marker=None):
+        self._nav_start = time.perf_counter()
+        self._marker = marker
+
+    def page_loaded(self, locator=None, timeout=PAGE_TIMEOUT):
+        if self._nav_start is not None:
+            try:
+                wait = WebDriverWait(self.driver, timeout)
+                if self._marker is not None:
+                    wait.until(EC.staleness_of(self._marker))
+                if locator is not None:
+                    wait.until(EC.presence_of_element_located(locator))
+                self.page_times.append(time.perf_counter() - self._nav_start)
+            except TimeoutException:
+                pass  # pas de changement de page observé : rien à mesurer
+            self._nav_start = None
+            self._marker = None
+        try:
+            self.rss_samples_kb.append(_process_tree_rss_kb(self.driver.service.process.pid))
+        except Exception:
+            pass
+
+    def summary(self, label):
+        if not self.page_times:
+            return f"[MESURES] {label} : aucune page mesurée"
+        peak_mb = max(self.rss_samples_kb, default=0) / 1024
+        return (
+            f"[MESURES] {label} : {len(self.page_times)} pages, "
+            f"chargement médian {statistics.median(self.page_times):.2f}s, "
+            f"max {max(self.page_times):.2f}s, RSS navigateur max {peak_mb:.0f} Mo"
+        )
+
+
+def navigation_started(driver, marker=None):
+    """
+    À appeler juste avant le clic ; `marker` : élément de la page courante
+    qui disparaîtra avec elle (premier lien de la liste, bouton Suivant).
+    """
+    metrics = getattr(driver, "crawl_metrics", None)
+    if metrics:
+        metrics.navigation_started(marker)
+
+
+def page_loaded(driver, locator=None):
+    """
+    À appeler juste après le clic : attend la disparition du témoin puis la
+    présence de `locator` (By, valeur), et enregistre le temps écoulé.
+    """
+    metrics = getattr(driver, "crawl_metrics", None)
+    if metrics:
+        metrics.page_loaded(locator)
+
+# ----------------------------
+#  Pauses & enregistrement des pages (voir listing_cassette.py)
+# ----------------------------
+def pause(driver, seconds):
+    """
+    time.sleep de politesse entre deux pages ; sauté au rejeu d'une cassette.
+    """
+    if not getattr(driver, "replaying", False):
+        time.sleep(seconds)
+
+
+def record_page(driver):
+    """
+    À appeler une fois la page lue : enregistre page_source en mode record.
+    """
+    recorder = getattr(driver, "listing_recorder", None)
+    if recorder:
+        recorder.record(driver)
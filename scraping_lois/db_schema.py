@@ -0,0 +1,111 @@
+import polars as pl
+
+from doc_identity import with_doc_identity
+
+# ----------------------------
+#  Schéma de db_urls.parquet
+# ----------------------------
+# La version du schéma est stockée dans les métadonnées clé/valeur du parquet.
+# Les migrations sont appliquées à la lecture (en mémoire) et ne sont
+# persistées qu'à la prochaine écriture normale de la DB : un changement de
+# schéma ne coûte jamais un aller-retour download/upload supplémentaire.
+
+SCHEMA_VERSION_KEY = "db_urls_schema_version"
+
+BASE_SCHEMA = {
+    "url": pl.String,
+    "provenance": pl.String,
+    "added_at": pl.String,
+}
+
+
+# Validateurs HTTP du PDF source, relevés au téléchargement et comparés par
+# revalidate_pdfs.py pour détecter les republications.
+PDF_VALIDATORS = {
+    "pdf_url": pl.String,
+    "content_length": pl.Int64,
+    "last_modified": pl.String,
+    "etag": pl.String,
+    "checked_at": pl.String,
+}
+
+
+def _add_missing(df, columns):
+    missing = [
+        pl.lit(default, dtype=dtype).alias(name)
+        for name, (default, dtype) in columns.items()
+        if name not in df.columns
+    ]
+    return df.with_columns(missing) if missing else df
+
+
+def _migration_1_download_status(df):
+    return _add_missing(df, {
+        "downloaded": (False, pl.Boolean),
+        "is_404": (False, pl.Boolean),
+        "pdf_name": (None, pl.String),
+    })
+
+
+def _migration_2_is_corrupted(df):
+    return _add_missing(df, {"is_corrupted": (False, pl.Boolean)})
+
+
+def _migration_3_doc_identity(df):
+    return with_doc_identity(df)
+
+
+def _migration_4_pdf_validators(df):
+    return _add_missing(df, {name: (None, dtype) for name, dtype in PDF_VALIDATORS.items()})
+
+
+# (version, description, fonction) — toujours ajouter à la fin, ne jamais réordonner.
+# Chaque migration doit être idempotente : une DB sans métadonnées est en version 0.
+MIGRATIONS = [
+    (1, "colonnes downloaded / is_404 / pdf_name", _migration_1_download_status),
+    (2, "colonne is_corrupted", _migration_2_is_corrupted),
+    (3, "colonnes doc_type / doc_id / legislature / doc_num", _migration_3_doc_identity),
+    (4, "validateurs HTTP du PDF (pdf_url / content_length / last_modified / etag / checked_at)", _migration_4_pdf_validators),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def read_schema_version(path):
+    try:
+        metadata = pl.read_parquet_metadata(path)
+    except Exception:
+        return 0
+    return int(metadata.get(SCHEMA_VERSION_KEY, 0))
+
+
+def migrate(df, from_version, log=print):
+    for version, description, migration in MIGRATIONS:
+        if version > from_version:
+            log(f"[SCHEMA] Migration v{version} : {description}")
+            df = migration(df)
+    return df
+
+
+def empty_db():
+    return migrate(pl.DataFrame(schema=BASE_SCHEMA), 0, log=lambda _: None)
+
+
+def read_db(path, log=print):
+    """
+    Lit la DB et applique en mémoire les migrations manquantes.
+    """
+    df = pl.read_parquet(path)
+    version = read_schema_version(path)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"DB en version de schéma {version}, ce code ne connaît que la v{SCHEMA_VERSION}."
+        )
+    return migrate(df, version, log)
+
+
+def write_db(df, path):
+    """
+    Écrit la DB en estampillant la version courante du schéma.
+    """
+    df.write_parquet(path, metadata={SCHEMA_VERSION_KEY: str(SCHEMA_VERSION)})
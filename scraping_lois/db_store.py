@@ -0,0 +1,90 @@
+import os
+import time
+import random
+import tempfile
+
+from db_schema import read_db, write_db, empty_db
+from storage import get_storage, ObjectNotFound, PreconditionFailed
+
+# ----------------------------
+#  Lecture / écriture concurrente de db_urls.parquet
+# ----------------------------
+# Contrôle de concurrence optimiste : on lit la DB avec son ETag, on applique
+# les modifications, puis on écrit avec If-Match (ou If-None-Match si la DB
+# n'existe pas encore). Si quelqu'un a écrit entre-temps, on relit la DB et on
+# ré-applique la même fonction de mise à jour ("rebase"), puis on réessaie.
+# Les pipelines décrivent donc leurs changements comme une fonction
+# base → nouvelle DB, et non comme une DB complète à écraser.
+
+storage = get_storage()
+
+DB_FILENAME = "db_urls.parquet"
+MAX_ATTEMPTS = 8
+
+
+class ConcurrentUpdateError(Exception):
+    pass
+
+
+def _tmp_path(suffix):
+    return os.path.join(tempfile.gettempdir(), f"db_urls.{os.getpid()}.{suffix}.parquet")
+
+
+def fetch_db(log=print, key=DB_FILENAME, read=read_db, empty=empty_db):
+    """
+    Retourne (df, etag). etag vaut None si la DB n'existe pas encore.
+    `read(path, log)` / `empty()` permettent de réutiliser ce module pour
+    d'autres tables parquet partagées (ex: pdf_catalog.py).
+    """
+    try:
+        etag, chunks = storage.stream(key)
+    except ObjectNotFound:
+        return empty(), None
+
+    path = _tmp_path("read")
+    try:
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        return read(path, log), etag
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _conditional_put(df, etag, key, write=write_db):
+    path = _tmp_path("write")
+    try:
+        write(df, path)
+        with open(path, "rb") as f:
+            body = f.read()
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+    return storage.put(key, body, if_match=etag, if_none_match=etag is None)
+
+
+def commit_db(update, log=print, base=None, key=DB_FILENAME, max_attempts=MAX_ATTEMPTS,
+              read=read_db, write=write_db, empty=empty_db):
+    """
+    Applique `update(df) -> df` à la DB distante et l'écrit de façon conditionnelle.
+    `base` = (df, etag) déjà lus, pour éviter une relecture au premier essai.
+    Retourne (df écrit, nouvel etag).
+    """
+    for attempt in range(1, max_attempts + 1):
+        df, etag = base if base is not None else fetch_db(log, key, read, empty)
+        base = None
+        new_df = update(df)
+        try:
+            new_etag = _conditional_put(new_df, etag, key, write)
+            if attempt > 1:
+                log(f"[DB] ✅ Écriture réussie après {attempt - 1} rebase(s)")
+            return new_df, new_etag
+        except PreconditionFailed:
+            delay = min(30, 2 ** attempt) * random.uniform(0.5, 1.0)
+            log(f"[DB] ⚠️ DB modifiée par un autre pipeline (essai {attempt}/{max_attempts}), "
+                f"rebase dans {delay:.1f}s")
+            time.sleep(delay)
+
+    raise ConcurrentUpdateError(f"Impossible d'écrire {key} après {max_attempts} essais")
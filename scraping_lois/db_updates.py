@@ -0,0 +1,117 @@
+from datetime import date
+
+import polars as pl
+
+from doc_identity import with_doc_identity
+from db_schema import PDF_VALIDATORS
+
+VALIDATOR_COLUMNS = ["pdf_url", "content_length", "last_modified", "etag"]
+
+# ----------------------------
+#  Mises à jour de db_urls.parquet
+# ----------------------------
+# Partagées par le pipeline principal (étape 5) et la fusion des shards.
+
+
+def new_db_entries(new_df, added_urls, today):
+    """
+    Lignes DB pour les URLs nouvellement scrapées (pas encore téléchargées).
+    """
+    return (
+        new_df.filter(pl.col("url").is_in(added_urls))
+              .select(["url", "provenance"])
+              .with_columns(
+                  pl.lit(today).alias("added_at"),
+                  pl.lit(False).alias("downloaded"),
+                  pl.lit(False).alias("is_404"),
+                  pl.lit(None).cast(pl.String).alias("pdf_name"),
+                  pl.lit(False).alias("is_corrupted")
+              )
+              .pipe(with_doc_identity)
+              .with_columns([pl.lit(None, dtype=dtype).alias(name) for name, dtype in PDF_VALIDATORS.items()])
+    )
+
+
+def results_frame(results_lf):
+    """
+    Résultats de téléchargement (url, status, filename) → colonnes de jointure.
+    """
+    return results_lf.select(
+        "url",
+        pl.col("status").alias("dl_status"),
+        pl.when(pl.col("status") == "success").then(pl.col("filename")).alias("pdf_name_new"),
+        *[pl.col(name).alias(f"{name}_new") for name in VALIDATOR_COLUMNS],
+    )
+
+
+def _take_validators(condition, checked_at):
+    """
+    Remplace les validateurs stockés par ceux du résultat quand `condition`.
+    """
+    return [
+        pl.when(condition).then(pl.col(f"{name}_new")).otherwise(pl.col(name)).alias(name)
+        for name in VALIDATOR_COLUMNS
+    ] + [pl.when(condition).then(pl.lit(checked_at)).otherwise(pl.col("checked_at")).alias("checked_at")]
+
+
+def apply_download_results(db_df, results_lf):
+    """
+    Reporte les résultats de téléchargement (LazyFrame) sur la DB.
+    """
+    is_success = (pl.col("dl_status") == "success").fill_null(False)
+    is_404 = (pl.col("dl_status") == "404").fill_null(False)
+
+    return (
+        db_df.lazy()
+             .join(results_frame(results_lf), on="url", how="left")
+             .with_columns(
+                 pl.when(is_success).then(True).otherwise(pl.col("downloaded")).alias("downloaded"),
+                 pl.when(is_404).then(True).otherwise(pl.col("is_404")).alias("is_404"),
+                 pl.when(is_success & (pl.col("is_corrupted") == True))
+                   .then(False)
+                   .otherwise(pl.col("is_corrupted"))
+                   .alias("is_corrupted"),
+                 pl.when(pl.col("pdf_name_new").is_not_null())
+                   .then(pl.col("pdf_name_new"))
+                   .otherwise(pl.col("pdf_name"))
+                   .alias("pdf_name"),
+                 *_take_validators(is_success, date.today().isoformat())
+             )
+             .drop(["dl_status", "pdf_name_new"] + [f"{name}_new" for name in VALIDATOR_COLUMNS])
+             .collect()
+    )
+
+
+def apply_revalidation(db_df, results_lf):
+    """
+    Reporte une passe de revalidation (revalidate_pdfs.py) sur la DB : nouveaux
+    validateurs pour les PDFs vérifiés ou re-téléchargés, et checked_at avancé
+    pour toutes les lignes sondées afin que la fenêtre glissante progresse.
+    """
+    status = pl.col("dl_status")
+    probed = status.is_not_null()
+    has_validators = status.is_in(["unchanged", "baseline", "changed"]).fill_null(False)
+
+    return (
+        db_df.lazy()
+             .join(results_frame(results_lf), on="url", how="left")
+             .with_columns(
+                 *_take_validators(has_validators, date.today().isoformat()),
+             )
+             .with_columns(
+                 pl.when(probed).then(pl.lit(date.today().isoformat())).otherwise(pl.col("checked_at")).alias("checked_at"),
+                 pl.when(status == "changed").then(False).otherwise(pl.col("is_corrupted")).alias("is_corrupted"),
+             )
+             .drop(["dl_status", "pdf_name_new"] + [f"{name}_new" for name in VALIDATOR_COLUMNS])
+             .collect()
+    )
+
+
+def downloaded_pdf_names(results_lf):
+    return (
+        results_lf.filter((pl.col("status") == "success") & pl.col("filename").is_not_null())
+                  .select("filename")
+                  .collect()
+                  .get_column("filename")
+                  .to_list()
+    )
@@ -0,0 +1,161 @@
+import re
+import time
+import random
+
+import polars as pl
+
+from legislatures import LEGACY_FILENAME_LEGISLATURE
+
+# ----------------------------
+#  Identité des documents
+# ----------------------------
+# Une seule table de motifs pour les deux chemins :
+#  - extract_id(url)           : ligne par ligne (chemin de téléchargement)
+#  - with_doc_identity(df)     : en masse via expressions Polars (DB)
+# L'ordre compte : le premier motif qui matche l'emporte.
+
+DOC_PATTERNS = {
+    "proposition_loi": r"propositions/pion([\w-]+)\.asp",
+    "projet_loi": r"projets/pl([\w-]+)\.asp",
+    "rapport_legislatif": r"rapports/r([\w-]+)\.asp",
+    "texte_adopte": r"/ta/ta([\w-]+)\.asp",
+    "dossier_legislatif": r"/textes/l\d+b(\d+)_",
+}
+DOC_TYPES = tuple(DOC_PATTERNS)
+
+LEGISLATURE_PATTERN = r"/dyn/(?:old/)?(\d+)/"
+
+_COMPILED_PATTERNS = [(dtype, re.compile(pattern)) for dtype, pattern in DOC_PATTERNS.items()]
+_COMPILED_LEGISLATURE = re.compile(LEGISLATURE_PATTERN)
+
+IDENTITY_SCHEMA = {
+    "doc_type": pl.String,
+    "doc_id": pl.String,
+    "legislature": pl.Int16,
+    "doc_num": pl.Int64,
+}
+
+
+def extract_id(url):
+    for dtype, pattern in _COMPILED_PATTERNS:
+        m = pattern.search(url)
+        if m:
+            return dtype, m.group(1)
+    return "inconnu", None
+
+
+def extract_legislature(url):
+    m = _COMPILED_LEGISLATURE.search(url)
+    return int(m.group(1)) if m else None
+
+
+def pdf_filename(doc_type, doc_id, legislature=None):
+    """
+    Nom du PDF sur le Cloud. Les numéros repartent de 1 à chaque législature,
+    elle est donc incluse dans le nom (sauf pour les noms historiques de la 17e).
+    """
+    if legislature is None or legislature == LEGACY_FILENAME_LEGISLATURE:
+        return f"{doc_type}_{doc_id}.pdf"
+    return f"{doc_type}_l{legislature}_{doc_id}.pdf"
+
+
+def split_pdf_name(pdf_name):
+    """
+    "projet_loi_1234.pdf" → ("projet_loi", "1234")
+    """
+    stem = pdf_name[:-4] if pdf_name.endswith(".pdf") else pdf_name
+    for doc_type in DOC_TYPES:
+        if stem.startswith(doc_type + "_"):
+            return doc_type, stem[len(doc_type) + 1:]
+    return "inconnu", stem
+
+
+DOC_NUM_PATTERN = r"^(\d+)"
+_COMPILED_DOC_NUM = re.compile(DOC_NUM_PATTERN)
+
+
+def doc_num_expr(doc_id):
+    """
+    Partie numérique de doc_id (ex: "1234-a0" → 1234).
+    """
+    return doc_id.str.extract(DOC_NUM_PATTERN, 1).cast(pl.Int64, strict=False).alias("doc_num")
+
+
+def doc_identity_exprs(url_col="url"):
+    """
+    Expressions Polars produisant doc_type, doc_id, legislature et doc_num.
+
+    Un seul str.extract par motif : le premier non nul (coalesce, dans l'ordre
+    de DOC_PATTERNS) donne doc_id, et son type donne doc_type.
+    """
+    url = pl.col(url_col)
+    matches = [url.str.extract(pattern, 1) for pattern in DOC_PATTERNS.values()]
+    doc_id = pl.coalesce(matches)
+    doc_type = pl.coalesce([
+        pl.when(match.is_not_null()).then(pl.lit(dtype)) for dtype, match in zip(DOC_PATTERNS, matches)
+    ]).fill_null("inconnu")
+
+    return [
+        doc_type.alias("doc_type"),
+        doc_id.alias("doc_id"),
+        url.str.extract(LEGISLATURE_PATTERN, 1).cast(pl.Int16, strict=False).alias("legislature"),
+        doc_num_expr(doc_id),
+    ]
+
+
+def with_doc_identity(df, url_col="url"):
+    # En lazy (extractions communes calculées une fois) et doc_num depuis la
+    # colonne doc_id déjà matérialisée, sans refaire les extractions.
+    doc_type, doc_id, legislature, _ = doc_identity_exprs(url_col)
+    return (
+        df.lazy()
+          .with_columns(doc_type, doc_id, legislature)
+          .with_columns(doc_num_expr(pl.col("doc_id")))
+          .collect()
+    )
+
+# ----------------------------
+#  Benchmark ligne à ligne vs Polars
+# ----------------------------
+def _synthetic_urls(n, seed=0):
+    rng = random.Random(seed)
+    templates = [
+        "https://www.assemblee-nationale.fr/dyn/old/17/propositions/pion{n}.asp",
+        "https://www.assemblee-nationale.fr/dyn/old/17/projets/pl{n}.asp",
+        "https://www.assemblee-nationale.fr/dyn/old/17/rapports/r{n}-a0.asp",
+        "https://www.assemblee-nationale.fr/dyn/old/17/ta/ta{n}.asp",
+        "https://www.assemblee-nationale.fr/dyn/17/textes/l17b{n}_proposition-loi",
+        "https://www.assemblee-nationale.fr/dyn/17/dossiers/autre_{n}",
+    ]
+    return [rng.choice(templates).format(n=rng.randint(1, 9999)) for _ in range(n)]
+
+
+def benchmark(n=1_000_000):
+    urls = _synthetic_urls(n)
+    df = pl.DataFrame({"url": urls})
+
+    # Même sortie des deux côtés : doc_type, doc_id, legislature, doc_num
+    start = time.perf_counter()
+    rows = []
+    for u in urls:
+        doc_type, doc_id = extract_id(u)
+        num = _COMPILED_DOC_NUM.match(doc_id) if doc_id else None
+        rows.append((doc_type, doc_id, extract_legislature(u), int(num.group(1)) if num else None))
+    row_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bulk = with_doc_identity(df)
+    bulk_time = time.perf_counter() - start
+
+    assert bulk["doc_type"].to_list() == [r[0] for r in rows]
+    assert bulk["doc_id"].to_list() == [r[1] for r in rows]
+    assert bulk["legislature"].to_list() == [r[2] for r in rows]
+    assert bulk["doc_num"].to_list() == [r[3] for r in rows]
+
+    print(f"{n} URLs")
+    print(f"   extract_id (ligne à ligne) : {row_time:.2f}s")
+    print(f"   with_doc_identity (Polars) : {bulk_time:.2f}s  (x{row_time / bulk_time:.1f})")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,274 @@
+import re
+import time
+import random
+import argparse
+import threading
+from datetime import datetime
+from collections import Counter
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+import polars as pl
+from lxml import html
+from requests.adapters import HTTPAdapter
+
+from db_store import fetch_db, commit_db
+from db_updates import new_db_entries
+from doc_identity import extract_id
+from legislatures import CURRENT_LEGISLATURE, dossiers_url
+from url_canonical import canonical_url, doc_key, with_doc_key, new_documents
+import http_cassette
+
+http_cassette.install()
+
+# ----------------------------
+#  Graphe des dossiers législatifs
+# ----------------------------
+# Chaque page de dossier liste les documents liés (textes successifs,
+# rapports, avis, textes adoptés) et d'autres dossiers. Parcours en largeur,
+# profondeur bornée : les pages d'une même profondeur sont récupérées en
+# parallèle, la déduplication (pages vues, clés de documents) se fait dans le
+# thread principal. Les documents déjà en DB (par doc_key, voir
+# url_canonical.py) sont marqués connus ; seuls les nouveaux sont ajoutés.
+# Chaque lien dossier → document est gardé dans dossier_edges.parquet.
+
+EDGES_FILENAME = "dossier_edges.parquet"
+PROVENANCE = "dossiers_legislatifs"
+MAX_DEPTH = 1
+WORKERS = 8
+
+DOSSIER_PAGE_PATTERN = re.compile(r"/dyn/\d+/dossiers/[^/]+$")
+
+EDGE_SCHEMA = {
+    "dossier_url": pl.String,
+    "doc_url": pl.String,
+    "doc_key": pl.String,
+    "doc_type": pl.String,
+    "depth": pl.Int16,
+    "discovered_at": pl.String,
+}
+
+
+def make_session(workers=WORKERS):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def page_links(session, page_url):
+    """
+    Liens <a href> absolus et canoniques d'une page ; None si la page est inaccessible.
+    """
+    try:
+        r = session.get(page_url, timeout=20)
+        r.raise_for_status()
+    except requests.RequestException:
+        return None
+    tree = html.fromstring(r.content)
+    return [canonical_url(urljoin(page_url, href)) for href in tree.xpath("//a/@href")]
+
+
+def is_dossier_page(url):
+    return bool(DOSSIER_PAGE_PATTERN.search(url))
+
+
+def crawl_dossier_graph(seeds, known_keys=frozenset(), max_depth=MAX_DEPTH, workers=WORKERS, session=None, log=print):
+    """
+    Retourne (documents, arêtes, statistiques) :
+      documents : DataFrame url, provenance, doc_key, is_new (un par doc_key)
+      arêtes    : DataFrame EDGE_SCHEMA
+    """
+    session = session or make_session(workers)
+    frontier = list(dict.fromkeys(canonical_url(u) for u in seeds))
+    seen_pages = set(frontier)
+    documents = {}
+    edges = []
+    stats = Counter()
+    today = datetime.now().date().isoformat()
+    start = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for depth in range(max_depth + 1):
+            if not frontier:
+                break
+            next_frontier = []
+            for page_url, links in zip(frontier, pool.map(lambda u: page_links(session, u), frontier)):
+                if links is None:
+                    stats["page_errors"] += 1
+                    continue
+                stats["pages"] += 1
+                for link in links:
+                    if is_dossier_page(link):
+                        if depth < max_depth and link not in seen_pages:
+                            seen_pages.add(link)
+                            next_frontier.append(link)
+                        continue
+                    doc_type, _ = extract_id(link)
+                    if doc_type == "inconnu":
+                        continue
+                    key = doc_key(link)
+                    stats["doc_links"] += 1
+                    edges.append((page_url, link, key, doc_type, depth, today))
+                    if key not in documents:
+                        documents[key] = link
+            log(f"[GRAPHE] profondeur {depth} : {len(frontier)} pages, {len(documents)} documents distincts")
+            frontier = next_frontier
+
+    stats["seconds"] = time.time() - start
+    stats["documents"] = len(documents)
+    stats["new_documents"] = sum(1 for key in documents if key not in known_keys)
+
+    docs_df = pl.DataFrame(
+        {"url": list(documents.values()), "doc_key": list(documents.keys())},
+        schema={"url": pl.String, "doc_key": pl.String},
+    ).with_columns(
+        pl.lit(PROVENANCE).alias("provenance"),
+        ~pl.col("doc_key").is_in(list(known_keys)).alias("is_new"),
+    )
+    edges_df = pl.DataFrame(edges, schema=EDGE_SCHEMA, orient="row").unique(subset=["dossier_url", "doc_key"])
+    return docs_df, edges_df, stats
+
+
+def log_stats(stats, log=print):
+    seconds = max(stats["seconds"], 1e-6)
+    dedup = 1 - stats["documents"] / stats["doc_links"] if stats["doc_links"] else 0
+    log(f"[GRAPHE] {stats['pages']} pages en {stats['seconds']:.1f}s ({stats['pages'] / seconds:.1f} pages/s), "
+        f"{stats['page_errors']} erreurs")
+    log(f"[GRAPHE] {stats['doc_links']} liens vers des documents → {stats['documents']} distincts "
+        f"(dédoublonnage {dedup:.0%}), dont {stats['new_documents']} absents de la DB")
+
+# ----------------------------
+#  Graines & enregistrement
+# ----------------------------
+def index_seeds(legislature=CURRENT_LEGISLATURE, session=None):
+    """
+    Pages de dossiers liées depuis l'index (première page, rendue côté serveur).
+    """
+    links = page_links(session or make_session(), dossiers_url(legislature)) or []
+    return [link for link in dict.fromkeys(links) if is_dossier_page(link)]
+
+
+def empty_edges():
+    return pl.DataFrame(schema=EDGE_SCHEMA)
+
+
+def _read_edges(path, log=print):
+    return pl.read_parquet(path)
+
+
+def _write_edges(df, path):
+    df.write_parquet(path, compression="zstd")
+
+
+def save_graph(docs_df, edges_df, log=print):
+    def merge_edges(base_df):
+        return pl.concat([base_df, edges_df]).unique(subset=["dossier_url", "doc_key"], keep="first", maintain_order=True)
+
+    commit_db(merge_edges, log, key=EDGES_FILENAME, read=_read_edges, write=_write_edges, empty=empty_edges)
+
+    today = datetime.now().date().isoformat()
+    added = {}
+
+    def add_new_documents(base_df):
+        fresh = new_documents(docs_df, base_df)
+        added["count"] = len(fresh)
+        return pl.concat([base_df, new_db_entries(docs_df, fresh, today)], how="vertical")
+
+    commit_db(add_new_documents, log)
+    log(f"[GRAPHE] ✅ {added['count']} nouveaux documents ajoutés à la DB, {edges_df.height} arêtes")
+
+# ----------------------------
+#  Site factice hors ligne (mesures)
+# ----------------------------
+class MockDossierSite:
+    """
+    Serveur HTTP local : un index, `n_dossiers` pages de dossiers liées entre
+    elles, chacune pointant vers des documents partagés sous plusieurs formes
+    d'URL (www/www2, /dyn/17 vs /dyn/old/17, fragments, page de liste
+    pionNNNN.asp vs page dossier l17bNNNN_…).
+    """
+
+    def __init__(self, n_dossiers=300, docs_per_dossier=12, latency=0.02, seed=0):
+        rng = random.Random(seed)
+        pool_size = n_dossiers * docs_per_dossier // 3
+        forms = [
+            "https://www.assemblee-nationale.fr/dyn/old/17/rapports/r{n:04d}.asp",
+            "https://www2.assemblee-nationale.fr/17/rapports/r{n:04d}.asp#annexe",
+            "https://www.assemblee-nationale.fr/dyn/old/17/ta/ta{n:04d}.asp",
+            "https://www.assemblee-nationale.fr/dyn/17/textes/l17b{n:04d}_proposition-loi",
+            "https://www.assemblee-nationale.fr/dyn/old/17/propositions/pion{n:04d}.asp",
+        ]
+        self.pages = {}
+        for i in range(n_dossiers):
+            docs = [rng.choice(forms).format(n=rng.randint(1, pool_size)) for _ in range(docs_per_dossier)]
+            related = [f"/dyn/17/dossiers/dossier_{rng.randrange(n_dossiers)}" for _ in range(2)]
+            self.pages[f"/dyn/17/dossiers/dossier_{i}"] = docs + related
+        self.pages["/dyn/17/dossiers"] = [f"/dyn/17/dossiers/dossier_{i}" for i in range(0, n_dossiers, 2)]
+        self.latency = latency
+        self.server = None
+
+    def __enter__(self):
+        pages, latency = self.pages, self.latency
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(latency)
+                links = pages.get(self.path)
+                if links is None:
+                    self.send_error(404)
+                    return
+                body = "".join(f'<a href="{link}">lien</a>' for link in links)
+                payload = f"<html><body>{body}</body></html>".encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def benchmark(workers_list=(1, 4, 8, 16), max_depth=2, known_fraction=0.5):
+    with MockDossierSite() as site:
+        seeds = [site.base_url + path for path in site.pages["/dyn/17/dossiers"]]
+        # Seen-set : une part des documents est supposée déjà en DB.
+        docs_df, _, _ = crawl_dossier_graph(seeds, max_depth=max_depth, workers=max(workers_list), log=lambda _: None)
+        known = set(docs_df.sample(fraction=known_fraction, seed=0)["doc_key"].to_list())
+        for workers in workers_list:
+            _, _, stats = crawl_dossier_graph(seeds, known, max_depth, workers, log=lambda _: None)
+            print(f"--- {workers} workers, profondeur {max_depth}")
+            log_stats(stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parcours du graphe des dossiers législatifs.")
+    parser.add_argument("--legislature", type=int, default=CURRENT_LEGISLATURE)
+    parser.add_argument("--seed", action="append", help="Page de dossier de départ (répétable) ; défaut : index")
+    parser.add_argument("--depth", type=int, default=MAX_DEPTH)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--mock", action="store_true", help="Mesures sur le site factice hors ligne")
+    args = parser.parse_args()
+
+    if args.mock:
+        benchmark()
+    else:
+        db_df, _ = fetch_db()
+        known_keys = set(with_doc_key(db_df.select("url"))["doc_key"].to_list())
+        seeds = args.seed or index_seeds(args.legislature)
+        docs_df, edges_df, stats = crawl_dossier_graph(seeds, known_keys, args.depth, args.workers)
+        log_stats(stats)
+        save_graph(docs_df, edges_df)
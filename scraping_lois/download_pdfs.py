@@ -1,46 +1,25 @@
 import os
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-import re
-import boto3
-from botocore.exceptions import NoCredentialsError
-from dotenv import load_dotenv
-
-load_dotenv()
-BUCKET_NAME = os.getenv("BUCKET_NAME")
-s3 = boto3.client(
-    's3',
-    endpoint_url=os.getenv("R2_ENDPOINT_URL"),
-    aws_access_key_id=os.getenv("R2_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("R2_SECRET_ACCESS_KEY")
-)
 
-BASE_URL = "https://www.assemblee-nationale.fr"
+from doc_identity import extract_id, extract_legislature, pdf_filename
+import pdf_url_resolver
+from results_buffer import ResultsBuffer
+from html_link_extract import find_pdf_href_stream, href_to_status, CHUNK_SIZE
+from storage import get_storage
+import http_cassette
 
-# ----------------------------
-#  Extracteur d’ID 
-# ----------------------------
-def extract_id(url):
-    patterns = {
-        "proposition_loi": r"propositions/pion([\w-]+)\.asp",
-        "projet_loi": r"projets/pl([\w-]+)\.asp",
-        "rapport_legislatif": r"rapports/r([\w-]+)\.asp",
-        "texte_adopte": r"/ta/ta([\w-]+)\.asp",
-        "dossier_legislatif": r"/textes/l17b(\d+)_",
-    }
-    for dtype, pattern in patterns.items():
-        m = re.search(pattern, url)
-        if m:
-            return dtype, m.group(1)
-    return "inconnu", None
+storage = get_storage()
+http_cassette.install()  # HTTP_CASSETTE_MODE=record|replay, voir http_cassette.py
+
+BASE_URL = "https://www.assemblee-nationale.fr"
 
 # ----------------------------
 #  Trouver le lien PDF 
 # ----------------------------
 def get_pdf_link(page_url):
     try:
-        r = requests.get(page_url, timeout=20)
+        r = requests.get(page_url, timeout=20, stream=True)
         r.raise_for_status()
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 404:
@@ -49,12 +28,18 @@ def get_pdf_link(page_url):
     except Exception as e:
         return None
 
-    soup = BeautifulSoup(r.text, "html.parser")
-    a = soup.find("a", title="Accéder au document au format PDF")
-    if not a:
-        return "no_link"
-    pdf_rel = a.get("href")
-    if not pdf_rel or not pdf_rel.endswith(".pdf"):
+    # requests annonce ISO-8859-1 par défaut pour text/html sans charset : on ne
+    # transmet l'encodage que s'il est explicite, sinon utf-8 (celui du site).
+    charset = r.encoding if "charset" in r.headers.get("Content-Type", "").lower() else None
+    try:
+        href = find_pdf_href_stream(r.iter_content(CHUNK_SIZE), charset)
+    except Exception as e:
+        return None
+    finally:
+        r.close()
+
+    pdf_rel = href_to_status(href)
+    if pdf_rel == "no_link":
         return "no_link"
     return urljoin(BASE_URL, pdf_rel)
 
@@ -64,7 +49,7 @@ def get_pdf_link(page_url):
 def upload_to_cloud_and_clean(local_path, filename, log):
     cloud_key = f"pdfs/{filename}"
     try:
-        s3.upload_file(local_path, BUCKET_NAME, cloud_key)
+        storage.upload_file(local_path, cloud_key)
         log(f"[CLOUD] ☁️ Upload réussi : {filename}")
         
         os.remove(local_path)
@@ -74,11 +59,29 @@ def upload_to_cloud_and_clean(local_path, filename, log):
         log(f"[ERREUR CLOUD] Impossible d'envoyer {filename}: {e}")
         return False
 
+# ----------------------------
+#  Validateurs HTTP (détection des republications)
+# ----------------------------
+def response_validators(r, body_size=None):
+    """
+    Content-Length / Last-Modified / ETag d'une réponse (GET ou HEAD).
+    """
+    length = r.headers.get("Content-Length")
+    return {
+        "pdf_url": r.url,
+        "content_length": int(length) if length and length.isdigit() else body_size,
+        "last_modified": r.headers.get("Last-Modified"),
+        "etag": r.headers.get("ETag"),
+    }
+
 # ----------------------------
 #  Télécharger un PDF
 # ----------------------------
-def download_pdf(doc_type, doc_id, pdf_url, pdf_dir, log):
-    filename = f"{doc_type}_{doc_id}.pdf"
+def download_pdf(doc_type, doc_id, pdf_url, pdf_dir, log, legislature=None):
+    """
+    Retourne (filename, validateurs HTTP), ou (None, {}) en cas d'échec.
+    """
+    filename = pdf_filename(doc_type, doc_id, legislature)
     filepath = os.path.join(pdf_dir, filename)
 
     try:
@@ -90,43 +93,55 @@ def download_pdf(doc_type, doc_id, pdf_url, pdf_dir, log):
             f.write(r.content)
 
         if upload_to_cloud_and_clean(filepath, filename, log):
-            return filename
+            return filename, response_validators(r, len(r.content))
         else:
-            return None
+            return None, {}
 
     except Exception as e:
         log(f"[ERREUR] Téléchargement impossible ({pdf_url}) : {e}")
-        return None
+        return None, {}
 
 # ----------------------------
-#  Fonction principale 
+#  Traiter une ligne (page → PDF → Cloud)
 # ----------------------------
-def download_new_pdfs(rows_to_process, pdf_dir, log):
-    results = []
-    for row in rows_to_process:
-        url = row["url"]
-        log(f"\n--- Analyse : {url}")
+def process_row(row, pdf_dir, log):
+    url = row["url"]
+    log(f"\n--- Analyse : {url}")
 
-        doc_type, doc_id = extract_id(url)
-        pdf_link_or_status = get_pdf_link(url)
+    doc_type, doc_id = extract_id(url)
+    pdf_link_or_status = pdf_url_resolver.resolve_pdf_link(url, get_pdf_link)
 
-        if pdf_link_or_status in ["404", "no_link", None]:
-            status = pdf_link_or_status if pdf_link_or_status else "error"
-            log(f"[STATUT] {status}")
-            results.append({"url": url, "status": status, "filename": None})
-            continue
+    if pdf_link_or_status in ["404", "no_link", None]:
+        status = pdf_link_or_status if pdf_link_or_status else "error"
+        log(f"[STATUT] {status}")
+        return {"url": url, "status": status, "filename": None}
 
-        pdf_url = pdf_link_or_status
-        if not doc_id:
-            log("[STATUT] Pas d'ID")
-            results.append({"url": url, "status": "no_id", "filename": None})
-            continue
+    pdf_url = pdf_link_or_status
+    if not doc_id:
+        log("[STATUT] Pas d'ID")
+        return {"url": url, "status": "no_id", "filename": None}
 
-        filename = download_pdf(doc_type, doc_id, pdf_url, pdf_dir, log)
-        
-        if filename:
-            results.append({"url": url, "status": "success", "filename": filename})
-        else:
-            results.append({"url": url, "status": "dl_failed", "filename": None})
+    filename, validators = download_pdf(doc_type, doc_id, pdf_url, pdf_dir, log, extract_legislature(url))
+
+    if filename:
+        return {"url": url, "status": "success", "filename": filename, **validators}
+    return {"url": url, "status": "dl_failed", "filename": None}
 
-    return results
\ No newline at end of file
+
+def log_resolver_stats(log):
+    for line in pdf_url_resolver.stats.summary():
+        log(f"[RÉSOLUTION PDF] {line}")
+
+# ----------------------------
+#  Fonction principale 
+# ----------------------------
+def download_new_pdfs(rows_to_process, pdf_dir, log, results=None):
+    """
+    `rows_to_process` peut être un itérateur paresseux ; les résultats sont
+    écrits par paquets dans un ResultsBuffer (retourné).
+    """
+    results = results if results is not None else ResultsBuffer()
+    for row in rows_to_process:
+        results.append(process_row(row, pdf_dir, log))
+    log_resolver_stats(log)
+    return results
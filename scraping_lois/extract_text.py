@@ -0,0 +1,233 @@
+import os
+import io
+import argparse
+import tempfile
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import polars as pl
+from PyPDF2 import PdfReader
+
+from doc_identity import split_pdf_name
+from pdf_catalog import pdf_metadata, catalog_row, upsert_catalog
+from storage import get_storage, ObjectNotFound
+
+storage = get_storage()
+
+# ----------------------------
+#  Corpus texte
+# ----------------------------
+# Un fichier parquet (zstd) par document, partitionné à la Hive :
+#   corpus/doc_type=<type>/<doc_id>.parquet  → colonnes doc_id, page, text
+# plus un manifeste corpus/_manifest.parquet qui garde l'ETag du PDF source :
+# seuls les PDFs dont l'ETag a changé sont ré-extraits.
+#
+# Lecture : pl.scan_parquet("corpus/**/*.parquet", hive_partitioning=True)
+
+PDF_PREFIX = "pdfs/"
+CORPUS_PREFIX = "corpus/"
+MANIFEST_KEY = f"{CORPUS_PREFIX}_manifest.parquet"
+
+MANIFEST_SCHEMA = {
+    "pdf_name": pl.String,
+    "doc_type": pl.String,
+    "doc_id": pl.String,
+    "content_hash": pl.String,
+    "n_pages": pl.Int32,
+    "extracted_at": pl.String,
+}
+
+MAX_PROCESSES = os.cpu_count() or 2
+FETCH_WORKERS = 8
+BATCH_SIZE = 64
+# "spawn" et non "fork" : les appelants ont déjà des threads actifs (fetchers,
+# échantillonneur du profilage) et forker un processus multi-thread peut figer
+# l'enfant sur un verrou hérité. Les workers réimportent ce module pour
+# extract_pages : les scripts appelants doivent avoir une garde __main__.
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def corpus_key(doc_type, doc_id):
+    return f"{CORPUS_PREFIX}doc_type={doc_type}/{doc_id}.parquet"
+
+# ----------------------------
+#  Extraction (processus séparés)
+# ----------------------------
+def extract_pages(pdf_bytes):
+    """
+    Retourne (textes par page, métadonnées du catalogue, erreur).
+    Exécutée dans le pool de processus.
+    """
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        pages = []
+        for page in reader.pages:
+            try:
+                pages.append(page.extract_text() or "")
+            except Exception:
+                pages.append("")
+        return pages, pdf_metadata(reader, len(pdf_bytes)), None
+    except Exception as e:
+        return None, None, str(e)
+
+# ----------------------------
+#  Manifeste & index distant
+# ----------------------------
+def load_manifest():
+    try:
+        body, _ = storage.get(MANIFEST_KEY)
+    except ObjectNotFound:
+        return pl.DataFrame(schema=MANIFEST_SCHEMA)
+    return pl.read_parquet(io.BytesIO(body))
+
+
+def save_manifest(manifest):
+    buf = io.BytesIO()
+    manifest.write_parquet(buf, compression="zstd")
+    storage.put(MANIFEST_KEY, buf.getvalue())
+
+
+def list_pdf_etags():
+    """
+    ETags de tout le préfixe pdfs/ (mode autonome, bucket entier).
+    """
+    return {
+        obj["key"][len(PDF_PREFIX):]: obj["etag"].strip('"')
+        for obj in storage.list(PDF_PREFIX)
+    }
+
+
+def head_pdf_etags(pdf_names):
+    """
+    ETags des seuls PDFs demandés (un HEAD chacun) ; absents du dictionnaire
+    s'ils ne sont pas sur le Cloud.
+    """
+    def head(pdf_name):
+        obj = storage.head(f"{PDF_PREFIX}{pdf_name}")
+        return pdf_name, obj["etag"].strip('"') if obj else None
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        return {name: etag for name, etag in pool.map(head, pdf_names) if etag is not None}
+
+
+def fetch_pdf(pdf_name):
+    body, _ = storage.get(f"{PDF_PREFIX}{pdf_name}")
+    return body
+
+
+def _safe_fetch(pdf_name):
+    try:
+        return fetch_pdf(pdf_name)
+    except Exception as e:
+        print(f"[TEXTE] ❌ {pdf_name} (téléchargement) : {e}")
+        return None
+
+
+def write_document(doc_type, doc_id, pages, work_dir):
+    df = pl.DataFrame(
+        {"doc_id": [doc_id] * len(pages), "page": list(range(1, len(pages) + 1)), "text": pages},
+        schema={"doc_id": pl.String, "page": pl.Int32, "text": pl.String}
+    )
+    local_path = os.path.join(work_dir, f"{doc_type}_{doc_id}.parquet")
+    try:
+        df.write_parquet(local_path, compression="zstd", compression_level=10)
+        storage.upload_file(local_path, corpus_key(doc_type, doc_id))
+    finally:
+        if os.path.exists(local_path):
+            os.remove(local_path)
+
+# ----------------------------
+#  Fonction principale
+# ----------------------------
+def extract_new_texts(pdf_names, log=print, max_processes=MAX_PROCESSES, etags=None):
+    """
+    Extrait le texte des PDFs donnés dont le contenu (ETag) a changé depuis
+    la dernière extraction, et met à jour le corpus + le manifeste.
+
+    `etags` (nom → ETag) évite les HEAD quand le préfixe a déjà été listé.
+    """
+    manifest = load_manifest()
+    known_hashes = dict(zip(manifest["pdf_name"].to_list(), manifest["content_hash"].to_list()))
+    if etags is None:
+        etags = head_pdf_etags(pdf_names)
+
+    todo = []
+    missing = 0
+    for pdf_name in pdf_names:
+        etag = etags.get(pdf_name)
+        if etag is None:
+            missing += 1
+            log(f"[TEXTE] ⚠️ {pdf_name} absent du Cloud")
+            continue
+        if known_hashes.get(pdf_name) != etag:
+            todo.append((pdf_name, etag))
+
+    unchanged = len(pdf_names) - len(todo) - missing
+    log(f"[TEXTE] {len(todo)} PDFs à extraire ({unchanged} inchangés, {missing} absents du Cloud)")
+    if not todo:
+        return {"extracted": 0, "failed": 0, "missing": missing}
+
+    today = datetime.now().isoformat(timespec="seconds")
+    new_rows = []
+    catalog_rows = []
+    failed = 0
+
+    with tempfile.TemporaryDirectory(prefix="corpus_") as work_dir, \
+         ThreadPoolExecutor(max_workers=FETCH_WORKERS) as fetcher, \
+         ProcessPoolExecutor(max_workers=max_processes, mp_context=MP_CONTEXT) as extractor:
+        # Par lots : borne la mémoire (PDFs bruts en vol) tout en gardant le pool occupé.
+        for start in range(0, len(todo), BATCH_SIZE):
+            batch = todo[start:start + BATCH_SIZE]
+            fetched = list(zip(batch, fetcher.map(_safe_fetch, [name for name, _ in batch])))
+            futures = [
+                (pdf_name, etag, extractor.submit(extract_pages, pdf_bytes))
+                for (pdf_name, etag), pdf_bytes in fetched if pdf_bytes is not None
+            ]
+            failed += len(batch) - len(futures)
+
+            for pdf_name, etag, future in futures:
+                pages, metadata, error = future.result()
+                if error is not None:
+                    failed += 1
+                    log(f"[TEXTE] ❌ {pdf_name} : {error}")
+                    continue
+                catalog_rows.append(catalog_row(pdf_name, etag, metadata))
+                doc_type, doc_id = split_pdf_name(pdf_name)
+                try:
+                    write_document(doc_type, doc_id, pages, work_dir)
+                except Exception as e:
+                    failed += 1
+                    log(f"[TEXTE] ❌ {pdf_name} (upload) : {e}")
+                    continue
+                new_rows.append({
+                    "pdf_name": pdf_name, "doc_type": doc_type, "doc_id": doc_id,
+                    "content_hash": etag, "n_pages": len(pages), "extracted_at": today,
+                })
+                log(f"[TEXTE] ✅ {pdf_name} ({len(pages)} pages)")
+
+    if new_rows:
+        updated = pl.DataFrame(new_rows, schema=MANIFEST_SCHEMA)
+        manifest = pl.concat([
+            manifest.filter(~pl.col("pdf_name").is_in(updated["pdf_name"])),
+            updated
+        ])
+        save_manifest(manifest)
+
+    try:
+        upsert_catalog(catalog_rows, log)
+    except Exception as e:
+        log(f"[CATALOGUE] ⚠️ Mise à jour impossible : {e}")
+
+    log(f"[TEXTE] Résultat : {len(new_rows)} extraits, {failed} échecs.")
+    return {"extracted": len(new_rows), "failed": failed, "missing": missing}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extraction du texte des PDFs vers le corpus parquet.")
+    parser.add_argument("--processes", type=int, default=MAX_PROCESSES)
+    args = parser.parse_args()
+
+    etags = list_pdf_etags()
+    names = sorted(name for name in etags if name.endswith(".pdf"))
+    extract_new_texts(names, max_processes=args.processes, etags=etags)
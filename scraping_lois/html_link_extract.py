@@ -0,0 +1,106 @@
+import time
+import argparse
+
+from lxml import etree
+from bs4 import BeautifulSoup
+
+PDF_ANCHOR_TITLE = "Accéder au document au format PDF"
+CHUNK_SIZE = 16 * 1024
+
+_NOT_FOUND = object()
+
+# ----------------------------
+#  Extraction du lien PDF
+# ----------------------------
+# Le corps de la page est lu par morceaux et passé à un parser lxml
+# incrémental : on s'arrête dès la première ancre <a title="..."> rencontrée,
+# sans décoder toute la page en str ni construire l'arbre complet.
+
+def find_pdf_href_stream(chunks, encoding=None):
+    """
+    Retourne le href de la première ancre PDF (éventuellement None/vide),
+    ou _NOT_FOUND si la page n'en contient pas.
+    """
+    parser = etree.HTMLPullParser(events=("start",), tag="a", encoding=encoding or "utf-8")
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if element.get("title") == PDF_ANCHOR_TITLE:
+                return element.get("href")
+    parser.close()
+    for _, element in parser.read_events():
+        if element.get("title") == PDF_ANCHOR_TITLE:
+            return element.get("href")
+    return _NOT_FOUND
+
+
+def find_pdf_href_soup(html_text):
+    """
+    Ancienne implémentation (BeautifulSoup + html.parser), gardée comme référence.
+    """
+    soup = BeautifulSoup(html_text, "html.parser")
+    a = soup.find("a", title=PDF_ANCHOR_TITLE)
+    if not a:
+        return _NOT_FOUND
+    return a.get("href")
+
+
+def href_to_status(href):
+    """
+    Traduit le résultat de l'extraction : "no_link" ou href relatif du PDF.
+    """
+    if href is _NOT_FOUND or not href or not href.endswith(".pdf"):
+        return "no_link"
+    return href
+
+# ----------------------------
+#  Microbenchmark
+# ----------------------------
+def _synthetic_page(n_links=2000, anchor_position=0.3):
+    """
+    Page de taille réaliste (~300 Ko) avec l'ancre PDF à `anchor_position`.
+    """
+    rows = [f'<li><a href="/dyn/17/acteurs/PA{i}" class="link">Député {i}</a></li>' for i in range(n_links)]
+    anchor = f'<a href="/dyn/opendata/PRJLANR5L17B0123.pdf" title="{PDF_ANCHOR_TITLE}">PDF</a>'
+    rows.insert(int(n_links * anchor_position), anchor)
+    body = "\n".join(rows)
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Projet de loi</title></head>"
+        f"<body><ul>{body}</ul><footer>{'é' * 5000}</footer></body></html>"
+    ).encode("utf-8")
+
+
+def _chunks(data):
+    return (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+
+
+def benchmark(html_bytes, repeat=50):
+    assert find_pdf_href_soup(html_bytes.decode("utf-8")) == find_pdf_href_stream(_chunks(html_bytes))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        find_pdf_href_soup(html_bytes.decode("utf-8"))
+    soup_ms = (time.perf_counter() - start) / repeat * 1000
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        find_pdf_href_stream(_chunks(html_bytes))
+    stream_ms = (time.perf_counter() - start) / repeat * 1000
+
+    print(f"Page de {len(html_bytes) / 1024:.0f} Ko, {repeat} itérations")
+    print(f"   BeautifulSoup (html.parser) : {soup_ms:.2f} ms/page")
+    print(f"   lxml incrémental            : {stream_ms:.2f} ms/page  (x{soup_ms / stream_ms:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark de l'extraction du lien PDF.")
+    parser.add_argument("html_file", nargs="?", help="Page HTML enregistrée (sinon page synthétique)")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.html_file:
+        with open(args.html_file, "rb") as f:
+            page = f.read()
+    else:
+        page = _synthetic_page()
+    benchmark(page, args.repeat)
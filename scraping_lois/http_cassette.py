@@ -0,0 +1,321 @@
+import io
+import os
+import sys
+import gzip
+import json
+import time
+import atexit
+import hashlib
+import argparse
+import threading
+from collections import Counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# ----------------------------
+#  Enregistrement / rejeu HTTP (cassettes)
+# ----------------------------
+# Intercepte HTTPAdapter.send : couvre requests.get/head comme les Sessions
+# (pdf_url_resolver, dossier_graph). Une entrée par requête, fichier gzip
+# <hash>.http.gz = une ligne JSON (statut, en-têtes, URL) puis le corps brut.
+# La clé est la méthode, l'URL et les en-têtes qui changent la réponse
+# (Range, If-None-Match, If-Modified-Since).
+#
+# À l'enregistrement, le corps n'est pas lu dans send : on garde ce que
+# l'appelant lit lui-même. Une réponse abandonnée tôt (sonde %PDF- du
+# résolveur, lien trouvé en cours de page) n'est donc pas téléchargée en
+# entier ; elle est enregistrée tronquée, comme tout corps au-delà de
+# HTTP_CASSETTE_MAX_BODY. Au rejeu, lire au-delà d'un corps tronqué lève
+# ConnectionError.
+#
+# Les listings Selenium (scrap_*.py) sont enregistrés et rejoués par
+# listing_cassette.py, qui seul dépend de selenium.
+#
+#   HTTP_CASSETTE_MODE=record  → requêtes réelles, réponses enregistrées
+#   HTTP_CASSETTE_MODE=replay  → aucune requête réseau ; une requête absente
+#                                de la cassette lève ConnectionError
+#   HTTP_CASSETTE_LATENCY=0.2  → latence injectée par réponse ou page rejouée (s)
+#   HTTP_CASSETTE_MAX_BODY     → octets de corps enregistrés au plus (8 Mo)
+
+CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", "off")
+CASSETTE_DIR = os.getenv(
+    "HTTP_CASSETTE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "cassettes", "default")
+)
+CASSETTE_LATENCY = float(os.getenv("HTTP_CASSETTE_LATENCY", 0))
+CASSETTE_MAX_BODY = int(os.getenv("HTTP_CASSETTE_MAX_BODY", 8 * 1024 * 1024))
+KEY_HEADERS = ("Range", "If-None-Match", "If-Modified-Since")
+MODES = ("off", "record", "replay")
+
+stats = Counter()
+_stats_lock = threading.Lock()
+_original_send = HTTPAdapter.send
+_installed = None
+
+
+def _count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+
+def request_key(request):
+    parts = [request.method, request.url] + [f"{h}={request.headers.get(h, '')}" for h in KEY_HEADERS]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def _entry_path(directory, key):
+    return os.path.join(directory, key[:2], f"{key}.http.gz")
+
+
+def save_entry(directory, request, response, body, truncated=False):
+    path = _entry_path(directory, request_key(request))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    header = {
+        "method": request.method,
+        "url": response.url,
+        "request_url": request.url,
+        "status": response.status_code,
+        "reason": response.reason,
+        "headers": dict(response.headers),
+        "truncated": truncated,
+        "recorded_at": time.time(),
+    }
+    tmp_path = f"{path}.{threading.get_ident()}.part"
+    with gzip.open(tmp_path, "wb") as f:
+        f.write(json.dumps(header).encode() + b"\n")
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+def load_entry(path):
+    with gzip.open(path, "rb") as f:
+        header = json.loads(f.readline())
+        body = f.read()
+    return header, body
+
+
+class _TeeRaw:
+    """
+    Enveloppe le raw urllib3 d'une réponse enregistrée : garde (jusqu'à
+    max_body) ce que l'appelant lit, et enregistre à la fin du flux ou à la
+    fermeture.
+    """
+
+    def __init__(self, raw, on_done, max_body):
+        self._raw = raw
+        self._on_done = on_done
+        self._max_body = max_body
+        self._buffer = bytearray()
+        self._overflow = False
+        self._done = False
+
+    def _keep(self, chunk):
+        room = self._max_body - len(self._buffer)
+        if len(chunk) > room:
+            self._overflow = True
+        self._buffer += chunk[:max(room, 0)]
+
+    def _finish(self, complete):
+        if not self._done:
+            self._done = True
+            self._on_done(bytes(self._buffer), not complete or self._overflow)
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            self._keep(chunk)
+            yield chunk
+        self._finish(complete=True)
+
+    def read(self, amt=None, **kwargs):
+        # Corps décodé (gzip/deflate), comme stream(decode_content=True) dans iter_content.
+        kwargs["decode_content"] = True
+        chunk = self._raw.read(amt, **kwargs)
+        self._keep(chunk)
+        if amt is None or not chunk:
+            self._finish(complete=True)
+        return chunk
+
+    def close(self):
+        self._finish(complete=False)
+        self._raw.close()
+
+    def release_conn(self):
+        self._finish(complete=False)
+        self._raw.release_conn()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class _ReplayRaw(io.BytesIO):
+    def __init__(self, body, truncated, url):
+        super().__init__(body)
+        self.truncated = truncated
+        self.url = url
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in iter(lambda: self.read(amt), b""):
+            yield chunk
+        if self.truncated:
+            raise requests.ConnectionError(f"Corps tronqué dans la cassette : {self.url}")
+
+    def release_conn(self):
+        pass
+
+
+def build_response(request, header, body):
+    response = requests.Response()
+    response.status_code = header["status"]
+    response.reason = header["reason"]
+    response.url = header["url"]
+    response.headers = CaseInsensitiveDict(header["headers"])
+    # Le corps enregistré est déjà décodé (gzip/deflate) : ne pas le redécoder.
+    response.headers.pop("Content-Encoding", None)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.request = request
+    # Lu par iter_content / .content comme une réponse réseau (stream=True compris).
+    response.raw = _ReplayRaw(body, header.get("truncated", False), request.url)
+    return response
+
+
+def _recording_send(directory, max_body):
+    def send(adapter, request, **kwargs):
+        response = _original_send(adapter, request, **kwargs)
+        bodyless = request.method == "HEAD" or response.status_code in (204, 304)
+
+        def on_done(body, truncated):
+            save_entry(directory, request, response, body, truncated and not bodyless)
+            _count("recorded_truncated" if truncated and not bodyless else "recorded")
+
+        response.raw = _TeeRaw(response.raw, on_done, max_body)
+        return response
+    return send
+
+
+def _replaying_send(directory, latency):
+    def send(adapter, request, **kwargs):
+        path = _entry_path(directory, request_key(request))
+        if not os.path.exists(path):
+            _count("misses")
+            raise requests.ConnectionError(f"Absent de la cassette : {request.method} {request.url}", request=request)
+        if latency:
+            time.sleep(latency)
+        _count("hits")
+        header, body = load_entry(path)
+        return build_response(request, header, body)
+    return send
+
+
+def install(mode=CASSETTE_MODE, directory=CASSETTE_DIR, latency=CASSETTE_LATENCY):
+    """
+    Active l'enregistrement ou le rejeu pour tout le processus (idempotent).
+    """
+    global _installed
+    if mode not in MODES:
+        raise ValueError(f"HTTP_CASSETTE_MODE inconnu : {mode} (attendu : {', '.join(MODES)})")
+    if mode == "off" or _installed == (mode, directory, latency):
+        return
+    if mode == "record":
+        HTTPAdapter.send = _recording_send(directory, CASSETTE_MAX_BODY)
+    else:
+        HTTPAdapter.send = _replaying_send(directory, latency)
+    if _installed is None:
+        atexit.register(lambda: print(f"[CASSETTE] {mode} {directory} : {dict(stats)}", file=sys.stderr))
+    _installed = (mode, directory, latency)
+
+
+def uninstall():
+    global _installed
+    HTTPAdapter.send = _original_send
+    _installed = None
+
+
+# ----------------------------
+#  Rejeu des pages enregistrées (non-régression du parsing)
+# ----------------------------
+def iter_entries(directory):
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            if filename.endswith(".http.gz"):
+                yield load_entry(os.path.join(dirpath, filename))
+
+
+def _check_expectations(results, expectations_path, save, unit):
+    if expectations_path and save:
+        with open(expectations_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f"Résultats attendus écrits dans {expectations_path}")
+    elif expectations_path:
+        with open(expectations_path, encoding="utf-8") as f:
+            expected = json.load(f)
+        diffs = [(key, expected.get(key), got) for key, got in results.items() if expected.get(key) != got]
+        for key, before, after in diffs:
+            print(f"  ≠ {key}\n      attendu : {before}\n      obtenu  : {after}")
+        print(f"{len(diffs)} différence(s) sur {len(results)} {unit}")
+        return not diffs
+    return True
+
+
+def replay_pdf_links(directory, expectations_path=None, save=False, latency=0):
+    """
+    Repasse toutes les pages HTML enregistrées dans get_pdf_link. Avec
+    `expectations_path`, compare aux résultats sauvegardés (ou les écrit avec `save`).
+    """
+    install("replay", directory, latency)
+    from download_pdfs import get_pdf_link
+
+    pages = sorted({
+        header["request_url"] for header, _ in iter_entries(directory)
+        if header["method"] == "GET" and "html" in header["headers"].get("Content-Type", "")
+    })
+    start = time.time()
+    results = {url: get_pdf_link(url) for url in pages}
+    elapsed = time.time() - start
+    print(f"{len(pages)} pages rejouées en {elapsed:.2f}s ({len(pages) / max(elapsed, 1e-6):.0f} pages/s)")
+    return _check_expectations(results, expectations_path, save, "pages")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cassettes HTTP et listings : statistiques et rejeu du parsing.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_stats = sub.add_parser("stats", help="Contenu d'une cassette")
+    p_stats.add_argument("--dir", default=CASSETTE_DIR)
+    p_links = sub.add_parser("links", help="Rejoue get_pdf_link sur toutes les pages enregistrées")
+    p_listings = sub.add_parser("listings", help="Rejoue les scrapers de listings Selenium")
+    p_listings.add_argument("--legislature", type=int, default=None)
+    for p in (p_links, p_listings):
+        p.add_argument("--dir", default=CASSETTE_DIR)
+        p.add_argument("--expect", help="Fichier JSON des résultats attendus")
+        p.add_argument("--save", action="store_true", help="Écrit les résultats dans --expect")
+        p.add_argument("--latency", type=float, default=0)
+    args = parser.parse_args()
+    # Les scrapers importent le module sous son nom : même état (_installed) qu'eux.
+    import http_cassette
+
+    if args.command == "stats":
+        counts, total = Counter(), 0
+        for dirpath, _, filenames in os.walk(args.dir):
+            for filename in filenames:
+                if filename.endswith(".http.gz"):
+                    total += os.path.getsize(os.path.join(dirpath, filename))
+        for header, body in iter_entries(args.dir):
+            counts[(header["method"], header["status"], header["headers"].get("Content-Type", "?").split(";")[0])] += 1
+        for (method, status, ctype), n in counts.most_common():
+            print(f"{n:6}  {method:4} {status}  {ctype}")
+        print(f"{sum(counts.values())} entrées, {total / 1e6:.1f} Mo compressés")
+        listings_dir = os.path.join(args.dir, "listings")
+        for name in sorted(os.listdir(listings_dir)) if os.path.isdir(listings_dir) else []:
+            with open(os.path.join(listings_dir, name, "index.json"), encoding="utf-8") as f:
+                index = json.load(f)
+            print(f"listing {index['start_url']} : {len(index['pages'])} pages")
+    elif args.command == "links":
+        ok = http_cassette.replay_pdf_links(args.dir, args.expect, args.save, args.latency)
+        sys.exit(0 if ok else 1)
+    else:
+        from legislatures import CURRENT_LEGISLATURE
+        from listing_cassette import replay_listings
+        ok = replay_listings(args.dir, args.legislature or CURRENT_LEGISLATURE, args.expect, args.save, args.latency)
+        sys.exit(0 if ok else 1)
@@ -0,0 +1,32 @@
+# ----------------------------
+#  Législatures
+# ----------------------------
+# La législature en cours est la seule dont les listings évoluent ; les
+# précédentes sont figées et n'ont besoin d'être crawlées qu'une fois.
+
+CURRENT_LEGISLATURE = 17
+
+# Les PDFs de la 17e ont été nommés sans législature ; ne pas changer cette
+# valeur quand CURRENT_LEGISLATURE avance.
+LEGACY_FILENAME_LEGISLATURE = 17
+
+WWW2_LISTING_URL = "https://www2.assemblee-nationale.fr/documents/liste/(type)/{doc_type}"
+
+
+def is_frozen(legislature):
+    return legislature < CURRENT_LEGISLATURE
+
+
+def listing_url(doc_type, legislature=CURRENT_LEGISLATURE):
+    """
+    URL d'un listing www2 (projets-loi, propositions-loi, rapports, ta).
+    La législature en cours garde l'URL historique, sans filtre.
+    """
+    url = WWW2_LISTING_URL.format(doc_type=doc_type)
+    if legislature != CURRENT_LEGISLATURE:
+        url += f"/(legislature)/{legislature}"
+    return url
+
+
+def dossiers_url(legislature=CURRENT_LEGISLATURE):
+    return f"https://www.assemblee-nationale.fr/dyn/{legislature}/dossiers"
@@ -0,0 +1,220 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+from urllib.parse import urljoin
+
+from lxml import html as lxml_html
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import (
+    WebDriverException, NoSuchElementException, StaleElementReferenceException
+)
+
+import http_cassette
+
+# ----------------------------
+#  Listings Selenium : enregistrement et rejeu sans navigateur
+# ----------------------------
+# <dir>/listings/<hash de l'URL de départ>/index.json + page-NNNN.html.gz.
+# La clé est l'URL passée à driver.get (dossiers_url, listing_url).
+#
+# Pages enregistrées depuis driver.page_source et rejouées par ReplayDriver,
+# sans navigateur : mêmes XPath, même pagination, et pause() saute les
+# time.sleep de politesse. Le mode (record/replay) et le dossier sont ceux
+# de http_cassette.install().
+
+def _listing_dir(directory, start_url):
+    return os.path.join(directory, "listings", hashlib.sha256(start_url.encode()).hexdigest()[:16])
+
+
+class ListingRecorder:
+    """
+    Attaché au driver par record_listings : record(driver) enregistre la page
+    courante du listing ouvert par le dernier driver.get.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.start_url = None
+        self.pages = []
+
+    def start(self, url):
+        self.start_url = url
+        self.pages = []
+
+    def record(self, driver):
+        if self.start_url is None:
+            return
+        listing_dir = _listing_dir(self.directory, self.start_url)
+        os.makedirs(listing_dir, exist_ok=True)
+        self.pages.append(driver.current_url)
+        with gzip.open(os.path.join(listing_dir, f"page-{len(self.pages):04d}.html.gz"), "wb") as f:
+            f.write(driver.page_source.encode("utf-8"))
+        index = {"start_url": self.start_url, "pages": self.pages, "recorded_at": time.time()}
+        with open(os.path.join(listing_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+        http_cassette._count("listing_pages_recorded")
+
+
+def record_listings(driver, directory=None):
+    """
+    Enregistre les pages de listing lues par ce driver (mode record seulement).
+    """
+    active = http_cassette._installed
+    if active is None or active[0] != "record":
+        return driver
+    recorder = ListingRecorder(directory or active[1])
+    original_get = driver.get
+
+    def get(url):
+        recorder.start(url)
+        return original_get(url)
+
+    driver.get = get
+    driver.listing_recorder = recorder
+    return driver
+
+
+class ReplayElement:
+    def __init__(self, driver, node, page_number):
+        self._driver = driver
+        self._node = node
+        self._page_number = page_number
+
+    def _check(self):
+        if self._driver.page_number != self._page_number:
+            raise StaleElementReferenceException("Page rejouée suivante chargée")
+
+    def get_attribute(self, name):
+        self._check()
+        value = self._node.get(name)
+        # Comme Selenium : href/src résolus en URLs absolues.
+        if value is not None and name in ("href", "src"):
+            return urljoin(self._driver.current_url, value)
+        return value
+
+    @property
+    def text(self):
+        self._check()
+        return self._node.text_content()
+
+    def is_displayed(self):
+        # Pas de CSS au rejeu : un bouton masqué sur la dernière page est
+        # cliqué, et le clic au-delà des pages enregistrées lève NoSuchElementException.
+        self._check()
+        return True
+
+    def is_enabled(self):
+        self._check()
+        return True
+
+    def click(self):
+        self._check()
+        self._driver.next_page()
+
+
+class ReplayDriver:
+    """
+    Sous-ensemble de l'API WebDriver utilisé par les scrapers de listings
+    (get, find_element(s) en XPATH / TAG_NAME, clic via execute_script),
+    servi depuis les pages enregistrées.
+    """
+
+    replaying = True
+
+    def __init__(self, directory=None, latency=None):
+        active = http_cassette._installed or ("replay", http_cassette.CASSETTE_DIR, http_cassette.CASSETTE_LATENCY)
+        self.directory = directory or active[1]
+        self.latency = active[2] if latency is None else latency
+        self.current_url = None
+        self.page_number = 0
+        self._listing_dir = None
+        self._pages = []
+        self._source = ""
+        self._tree = None
+
+    def get(self, url):
+        listing_dir = _listing_dir(self.directory, url)
+        index_path = os.path.join(listing_dir, "index.json")
+        if not os.path.exists(index_path):
+            http_cassette._count("listing_misses")
+            raise WebDriverException(f"Listing absent de la cassette : {url}")
+        with open(index_path, encoding="utf-8") as f:
+            self._pages = json.load(f)["pages"]
+        self._listing_dir = listing_dir
+        self._load(1)
+
+    def _load(self, page_number):
+        if self.latency:
+            time.sleep(self.latency)
+        with gzip.open(os.path.join(self._listing_dir, f"page-{page_number:04d}.html.gz"), "rb") as f:
+            self._source = f.read().decode("utf-8")
+        self._tree = lxml_html.fromstring(self._source)
+        self.page_number = page_number
+        self.current_url = self._pages[page_number - 1]
+        http_cassette._count("listing_pages_replayed")
+
+    def next_page(self):
+        if self.page_number >= len(self._pages):
+            raise NoSuchElementException("Plus de page enregistrée pour ce listing")
+        self._load(self.page_number + 1)
+
+    @property
+    def page_source(self):
+        return self._source
+
+    def find_elements(self, by, value):
+        if by == By.XPATH:
+            xpath = value
+        elif by == By.TAG_NAME:
+            xpath = f"//{value}"
+        else:
+            raise NotImplementedError(f"Localisateur non rejouable : {by}")
+        return [
+            ReplayElement(self, node, self.page_number)
+            for node in self._tree.xpath(xpath) if isinstance(node, lxml_html.HtmlElement)
+        ]
+
+    def find_element(self, by, value):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException(value)
+        return found[0]
+
+    def execute_script(self, script, *args):
+        if script.strip() == "arguments[0].click();":
+            return args[0].click()
+        raise NotImplementedError(f"Script non rejouable : {script}")
+
+    def quit(self):
+        pass
+
+
+def listing_driver(make_driver):
+    """
+    Driver des listings selon le mode actif : ReplayDriver au rejeu (aucun
+    navigateur lancé), sinon make_driver(), enregistré en mode record.
+    """
+    active = http_cassette._installed
+    if active is not None and active[0] == "replay":
+        return ReplayDriver()
+    return record_listings(make_driver())
+
+def replay_listings(directory, legislature, expectations_path=None, save=False, latency=0):
+    """
+    Repasse les listings enregistrés d'une législature dans les scrapers
+    (parsing + pagination), sans navigateur ni pauses.
+    """
+    http_cassette.install("replay", directory, latency)
+    from scrap_urls_all import iter_urls_all
+
+    results = {}
+    start = time.time()
+    for provenance, urls in iter_urls_all(legislature):
+        results.setdefault(provenance, []).extend(urls)
+    elapsed = time.time() - start
+    results = {provenance: sorted(set(urls)) for provenance, urls in results.items()}
+    print(f"{http_cassette.stats['listing_pages_replayed']} pages de listing rejouées en {elapsed:.2f}s, "
+          f"{sum(len(urls) for urls in results.values())} URLs")
+    return http_cassette._check_expectations(results, expectations_path, save, "listings")
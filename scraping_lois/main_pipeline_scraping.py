@@ -2,13 +2,22 @@ import os
 import polars as pl
 import pandas as pd
 from datetime import datetime
-import boto3
 from dotenv import load_dotenv
 import io
+import sys
 import traceback
 
 from scrap_urls_all import scrap_urls_all
+from opendata_ingest import ingest_archives, default_sources
 from download_pdfs import download_new_pdfs
+from db_schema import empty_db
+from db_store import fetch_db, commit_db
+from db_updates import new_db_entries, apply_download_results, downloaded_pdf_names
+from extract_text import extract_new_texts
+from streaming_pipeline import crawl_and_download
+from url_canonical import canonical_frame, new_documents, with_doc_key, update_aliases
+from profiling import profile_stage, upload_profiles
+from storage import get_storage
 
 load_dotenv()
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -17,16 +26,15 @@ PDF_DIR = os.path.join(DB_DIR, "pdf")
 LOG_DIR = os.path.join(DB_DIR, "logs")
 LOG_PIPELINE_DIR = os.path.join(LOG_DIR, "pipeline_scraping_pdf_main")
 
+# Mode streaming : crawl et téléchargements se chevauchent (voir streaming_pipeline.py)
+STREAMING = "--streaming" in sys.argv or os.getenv("PIPELINE_STREAMING") == "1"
+# Source des URLs : archives open data au lieu du crawl Selenium (voir opendata_ingest.py)
+OPENDATA = "--opendata" in sys.argv or os.getenv("PIPELINE_URL_SOURCE") == "opendata"
+
 os.makedirs(LOG_PIPELINE_DIR, exist_ok=True)
 os.makedirs(PDF_DIR, exist_ok=True)
 
-BUCKET_NAME = os.getenv("BUCKET_NAME")
-s3 = boto3.client(
-    's3',
-    endpoint_url=os.getenv("R2_ENDPOINT_URL"),
-    aws_access_key_id=os.getenv("R2_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("R2_SECRET_ACCESS_KEY")
-)
+storage = get_storage()
 
 logfile = os.path.join(LOG_PIPELINE_DIR, f"pipeline_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.log")
 
@@ -38,167 +46,176 @@ def log(message: str):
         f.write(line + "\n")
     return line
 
-# ===============================================
-#  ÉTAPE 0: RÉCUPÉRATION DB DEPUIS LE CLOUD
-# ===============================================
-log("\n" + "="*30 + " ÉTAPE 0: SYNC CLOUD " + "="*30)
-log("Téléchargement de la DB depuis Scaleway...")
-
-DB_FILENAME = "db_urls.parquet"
-local_db_path = os.path.join(DB_DIR, DB_FILENAME)
-
-try:
-    s3.download_file(BUCKET_NAME, DB_FILENAME, local_db_path)
-    log("✅ DB récupérée avec succès.")
-    old_df = pl.read_parquet(local_db_path)
-except Exception as e:
-    log(f"⚠️ Pas de DB trouvée sur le Cloud ou erreur ({e}). Création d'une nouvelle.")
-    old_df = pl.DataFrame(
-        {"url": [], "provenance": [], "added_at": [], "downloaded": [], "is_404": [], "pdf_name": []},
-        schema={"url": pl.String, "provenance": pl.String, "added_at": pl.String, "downloaded": pl.Boolean, "is_404": pl.Boolean, "pdf_name": pl.String}
-    )
-
-old_urls = set(old_df["url"].to_list())
-log(f"Base actuelle : {len(old_urls)} URLs")
-
-# ===============================================
-#  ÉTAPE 1: SCRAPING 
-# ===============================================
-log("\n" + "="*30 + " ÉTAPE 1: SCRAPING " + "="*30) 
-try:
-    df_scraped_pandas = scrap_urls_all()
-    log(f"Scraping terminé. {len(df_scraped_pandas)} URLs trouvées.")
-    new_df = pl.from_pandas(df_scraped_pandas)
-except Exception as e:
-    log(f"ERREUR FATALE SCRAPING: {e}")
-    exit(1)
-
-# ===============================================
-#  ÉTAPE 2 & 3: COMPARAISON
-# ===============================================
-log("\n" + "="*25 + " ÉTAPE 2/3: COMPARAISON " + "="*25)
-
-# Sécurités colonnes
-if "downloaded" not in old_df.columns: old_df = old_df.with_columns(pl.lit(False).alias("downloaded"))
-if "is_404" not in old_df.columns: old_df = old_df.with_columns(pl.lit(False).alias("is_404"))
-if "is_corrupted" not in old_df.columns: old_df = old_df.with_columns(pl.lit(False).alias("is_corrupted"))
-
-corrupted_urls = set(
-    old_df.filter(
-        (pl.col("is_corrupted") == True) & 
-        (pl.col("is_404") == False)
-    )
-    .get_column("url")
-    .to_list()
-)
-log(f"PDFs corrompus : {len(corrupted_urls)}")
-
-new_urls = set(new_df["url"].to_list())
-added_urls = new_urls - old_urls
-log(f"Nouveaux liens : {len(added_urls)}")
-
-retry_urls = set(old_df.filter((pl.col("downloaded") == False) & (pl.col("is_404") == False)).get_column("url").to_list())
-retry_urls = retry_urls - added_urls
-log(f"À réessayer : {len(retry_urls)}")
-
-urls_to_process = added_urls.union(retry_urls)
-log(f"Total à traiter : {len(urls_to_process)}")
-
-if not urls_to_process:
-    log("Rien à faire. Fin.")
-
-    exit(0)
-
-rows_corrupted = old_df.filter(pl.col("url").is_in(corrupted_urls)).select(["url", "provenance"])
-rows_from_new = new_df.filter(pl.col("url").is_in(added_urls)).select(["url", "provenance"])
-rows_from_old = old_df.filter(pl.col("url").is_in(retry_urls)).select(["url", "provenance"])
-
-rows_to_download = pl.concat([rows_corrupted, rows_from_new, rows_from_old]).to_dicts()
-
-# ===============================================
-#  ÉTAPE 4: TÉLÉCHARGEMENT & UPLOAD CLOUD
-# ===============================================
-log("\n" + "="*25 + " ÉTAPE 4: DL & UPLOAD " + "="*25) 
-download_results = download_new_pdfs(rows_to_download, PDF_DIR, log)
-
-count_success = 0
-count_404 = 0
-success_urls = set()
-failed_404_urls = set()
-
-for res in download_results:
-    if res["status"] == "success":
-        count_success += 1
-        success_urls.add(res["url"])
-    elif res["status"] == "404":
-        count_404 += 1
-        failed_404_urls.add(res["url"])
-
-log(f"Résultat : {count_success} succès (sur Cloud), {count_404} erreurs 404.")
-
-# ===============================================
-#  ÉTAPE 5: MISE À JOUR DB ET ENVOI CLOUD
-# ===============================================
-
-log("\n" + "="*25 + " ÉTAPE 5: SAUVEGARDE CLOUD " + "="*25)
-today = datetime.now().date().isoformat()
-
-successful_map = [
-    {"url": r["url"], "pdf_name_new": r["filename"]}
-    for r in download_results if r["status"] == "success" and r["filename"] is not None
-]
-df_success_map = pl.DataFrame(successful_map, schema=[("url", pl.String), ("pdf_name_new", pl.String)])
-
-new_entries = (
-    new_df.filter(pl.col("url").is_in(added_urls))
-          .select(["url", "provenance"])
-          .with_columns(
-              pl.lit(today).alias("added_at"),
-              pl.lit(False).alias("downloaded"),
-              pl.lit(False).alias("is_404"),
-              pl.lit(None).cast(pl.String).alias("pdf_name"),
-              pl.lit(False).alias("is_corrupted")   
-          )
-)
-
-final_df = pl.concat([old_df, new_entries], how="vertical")
-
-final_df = final_df.join(df_success_map, on="url", how="left")
-
-final_df = final_df.with_columns(
-    pl.when(pl.col("url").is_in(success_urls)).then(True).otherwise(pl.col("downloaded")).alias("downloaded"),
-    pl.when(pl.col("url").is_in(failed_404_urls)).then(True).otherwise(pl.col("is_404")).alias("is_404"),    
-    pl.when(pl.col("url").is_in(success_urls) & (pl.col("is_corrupted") == True))
-      .then(False)
-      .otherwise(pl.col("is_corrupted"))
-      .alias("is_corrupted"),
-    pl.when(pl.col("pdf_name_new").is_not_null())
-      .then(pl.col("pdf_name_new"))
-      .otherwise(pl.col("pdf_name"))
-      .alias("pdf_name")
-).drop("pdf_name_new")
-
-final_df.write_parquet(local_db_path)
-
-log("☁️  Envoi de la DB mise à jour vers Scaleway...")
-try:
-    log(f"Tente d'uploader {local_db_path} vers {BUCKET_NAME}/{DB_FILENAME}")
-    s3.upload_file(local_db_path, BUCKET_NAME, DB_FILENAME)
-    log("✅ DB synchronisée sur le Cloud.")
-    os.remove(local_db_path) 
-    log("🗑️ Fichier db_urls.parquet temporaire supprimé localement.")
-
-except Exception as e:
-    log(f"❌ ERREUR CRITIQUE: Impossible d'envoyer la DB sur le Cloud: {e}")
-    log(f"Détails complets de l'erreur d'upload S3 : {traceback.format_exc()}") # AJOUT ICI
-    exit(1)
-
-try:
-    log_name = os.path.basename(logfile)
-    s3.upload_file(logfile, BUCKET_NAME, f"logs/pipeline_scraping_pdf_main/{log_name}")
-    log("✅ Log envoyé sur le Cloud.")
-
-except Exception as e:
-    log(f"⚠️ Erreur upload log: {e}")
-
-log("=== FIN DU PIPELINE ===")
\ No newline at end of file
+def main():
+    # ===============================================
+    #  ÉTAPE 0: RÉCUPÉRATION DB DEPUIS LE CLOUD
+    # ===============================================
+    log("\n" + "="*30 + " ÉTAPE 0: SYNC CLOUD " + "="*30)
+    log("Téléchargement de la DB depuis Scaleway...")
+
+    DB_FILENAME = "db_urls.parquet"
+
+    try:
+        old_df, db_etag = fetch_db(log)
+        if db_etag is None:
+            log("⚠️ Pas de DB trouvée sur le Cloud. Création d'une nouvelle.")
+        else:
+            log("✅ DB récupérée avec succès.")
+    except Exception as e:
+        # L'écriture finale est conditionnelle : si la DB existe en fait, elle sera
+        # relue et les changements ré-appliqués au lieu de l'écraser.
+        log(f"⚠️ Erreur de lecture de la DB ({e}). Création d'une nouvelle.")
+        old_df, db_etag = empty_db(), None
+
+    old_urls = set(old_df["url"].to_list())
+    old_keys = set(with_doc_key(old_df.select("url"))["doc_key"].to_list())
+    log(f"Base actuelle : {len(old_urls)} URLs ({len(old_keys)} documents)")
+
+    def record_aliases(aliases_df):
+        try:
+            update_aliases(aliases_df, log)
+        except Exception as e:
+            log(f"⚠️ Erreur mise à jour des alias d'URLs : {e}")
+
+    if STREAMING:
+        # ===============================================
+        #  ÉTAPES 1→4: SCRAPING & DL EN FLUX
+        # ===============================================
+        log("\n" + "="*25 + " ÉTAPES 1→4: SCRAPING & DL EN FLUX " + "="*25)
+        seed_df = (
+            old_df.filter(
+                (pl.col("is_404") == False) &
+                ((pl.col("is_corrupted") == True) | (pl.col("downloaded") == False))
+            )
+            .select(["url", "provenance"])
+        )
+        log(f"PDFs corrompus ou à réessayer : {seed_df.height}")
+        with profile_stage("1-4_crawl_and_download", log):
+            raw_df, download_results = crawl_and_download(old_keys, seed_df.iter_rows(named=True), PDF_DIR, log)
+        new_df, aliases_df = canonical_frame(raw_df)
+        record_aliases(aliases_df)
+        added_urls = new_documents(new_df, old_df)
+        log(f"Nouveaux liens : {len(added_urls)}")
+    else:
+        # ===============================================
+        #  ÉTAPE 1: SCRAPING 
+        # ===============================================
+        log("\n" + "="*30 + " ÉTAPE 1: SCRAPING " + "="*30) 
+        try:
+            with profile_stage("1_scraping", log):
+                if OPENDATA:
+                    df_scraped_pandas = ingest_archives(default_sources())
+                else:
+                    df_scraped_pandas = scrap_urls_all()
+            log(f"Scraping terminé ({'open data' if OPENDATA else 'Selenium'}). {len(df_scraped_pandas)} URLs trouvées.")
+            new_df, aliases_df = canonical_frame(pl.from_pandas(df_scraped_pandas))
+            log(f"{new_df.height} documents distincts après canonisation des URLs.")
+        except Exception as e:
+            log(f"ERREUR FATALE SCRAPING: {e}")
+            exit(1)
+        record_aliases(aliases_df)
+
+        # ===============================================
+        #  ÉTAPE 2 & 3: COMPARAISON
+        # ===============================================
+        log("\n" + "="*25 + " ÉTAPE 2/3: COMPARAISON " + "="*25)
+
+        corrupted_urls = set(
+            old_df.filter(
+                (pl.col("is_corrupted") == True) & 
+                (pl.col("is_404") == False)
+            )
+            .get_column("url")
+            .to_list()
+        )
+        log(f"PDFs corrompus : {len(corrupted_urls)}")
+
+        # Comparaison sur la clé de document, pas sur l'URL brute (voir url_canonical.py)
+        added_urls = new_documents(new_df, old_df)
+        log(f"Nouveaux liens : {len(added_urls)}")
+
+        retry_urls = set(old_df.filter((pl.col("downloaded") == False) & (pl.col("is_404") == False)).get_column("url").to_list())
+        retry_urls = retry_urls - added_urls
+        log(f"À réessayer : {len(retry_urls)}")
+
+        urls_to_process = added_urls.union(retry_urls)
+        log(f"Total à traiter : {len(urls_to_process)}")
+
+        if not urls_to_process:
+            log("Rien à faire. Fin.")
+
+            exit(0)
+
+        rows_corrupted = old_df.filter(pl.col("url").is_in(corrupted_urls)).select(["url", "provenance"])
+        rows_from_new = new_df.filter(pl.col("url").is_in(added_urls)).select(["url", "provenance"])
+        rows_from_old = old_df.filter(pl.col("url").is_in(retry_urls)).select(["url", "provenance"])
+
+        rows_to_download = pl.concat([rows_corrupted, rows_from_new, rows_from_old]).iter_rows(named=True)
+
+        # ===============================================
+        #  ÉTAPE 4: TÉLÉCHARGEMENT & UPLOAD CLOUD
+        # ===============================================
+        log("\n" + "="*25 + " ÉTAPE 4: DL & UPLOAD " + "="*25) 
+        with profile_stage("4_download", log):
+            download_results = download_new_pdfs(rows_to_download, PDF_DIR, log)
+
+    log(f"Résultat : {download_results.counts['success']} succès (sur Cloud), {download_results.counts['404']} erreurs 404.")
+
+    # ===============================================
+    #  ÉTAPE 5: MISE À JOUR DB ET ENVOI CLOUD
+    # ===============================================
+
+    log("\n" + "="*25 + " ÉTAPE 5: SAUVEGARDE CLOUD " + "="*25)
+    today = datetime.now().date().isoformat()
+
+    def update_db(base_df):
+        """
+        Changements de ce run, ré-applicables sur une DB modifiée entre-temps
+        (ex: verif_pdfs_db.py qui tourne en parallèle).
+        """
+        fresh_urls = added_urls & new_documents(new_df, base_df)
+        new_entries = new_db_entries(new_df, fresh_urls, today)
+        return apply_download_results(
+            pl.concat([base_df, new_entries], how="vertical"),
+            download_results.scan()
+        )
+
+    log("☁️  Envoi de la DB mise à jour vers Scaleway...")
+    try:
+        log(f"Écriture conditionnelle de {storage.bucket}/{DB_FILENAME}")
+        with profile_stage("5_commit_db", log):
+            commit_db(update_db, log, base=(old_df, db_etag))
+        log("✅ DB synchronisée sur le Cloud.")
+
+    except Exception as e:
+        log(f"❌ ERREUR CRITIQUE: Impossible d'envoyer la DB sur le Cloud: {e}")
+        log(f"Détails complets de l'erreur d'upload S3 : {traceback.format_exc()}") # AJOUT ICI
+        exit(1)
+
+    # ===============================================
+    #  ÉTAPE 6: EXTRACTION DU TEXTE (CORPUS)
+    # ===============================================
+    log("\n" + "="*25 + " ÉTAPE 6: EXTRACTION TEXTE " + "="*25)
+    try:
+        new_pdf_names = downloaded_pdf_names(download_results.scan())
+        with profile_stage("6_extract_text", log):
+            extract_new_texts(new_pdf_names, log)
+    except Exception as e:
+        log(f"⚠️ Erreur extraction texte: {e}")
+
+    try:
+        log_name = os.path.basename(logfile)
+        storage.upload_file(logfile, f"logs/pipeline_scraping_pdf_main/{log_name}")
+        log("✅ Log envoyé sur le Cloud.")
+        upload_profiles("logs/pipeline_scraping_pdf_main", log)
+
+    except Exception as e:
+        log(f"⚠️ Erreur upload log: {e}")
+
+    download_results.cleanup()
+
+    log("=== FIN DU PIPELINE ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os
+import re
+import json
+import time
+import zipfile
+import argparse
+import tempfile
+import xml.etree.ElementTree as ET
+
+import requests
+import pandas as pd
+
+try:
+    import ijson  # lecture en flux ; repli sur json (fichier entier en mémoire)
+except ImportError:
+    ijson = None
+
+from legislatures import CURRENT_LEGISLATURE
+import http_cassette
+
+http_cassette.install()
+
+# ----------------------------
+#  Ingestion des archives open data de l'Assemblée
+# ----------------------------
+# Alternative au crawl Selenium : les archives zip (un JSON par document, ou
+# XML) listent tous les documents d'une législature. On les lit membre par
+# membre (JSON) ou en iterparse (XML) pour garder une mémoire bornée, et on
+# convertit chaque UID de document en la même ligne (url, provenance) que
+# scrap_urls_all().
+
+OPENDATA_ARCHIVE_URL = os.getenv(
+    "OPENDATA_ARCHIVE_URL",
+    "https://data.assemblee-nationale.fr/static/openData/repository/{leg}/loi/dossiers_legislatifs/Dossiers_Legislatifs.json.zip"
+)
+SITE_URL = "https://www.assemblee-nationale.fr"
+
+# Ex: PRJLANR5L17B0123, PIONANR5L17B0456, RAPPANR5L17B0789-a0, TAANR5L17TA0123
+# (série B des dépôts, série TA des textes adoptés)
+UID_PATTERN = re.compile(r"^(PRJL|PION|RAPP|TA)ANR5L(\d+)(B|TA)(\d+)(-[\w-]+)?$")
+
+UID_FAMILIES = {
+    "PRJL": ("projets", "pl", "projets_lois"),
+    "PION": ("propositions", "pion", "propositions_lois"),
+    "RAPP": ("rapports", "r", "rapports_legislatifs"),
+    "TA": ("ta", "ta", "textes_adoptes"),
+}
+
+
+def uid_to_row(uid):
+    """
+    UID open data → (url, provenance), ou None si le type n'est pas suivi.
+    """
+    m = UID_PATTERN.match(uid or "")
+    if not m:
+        return None
+    family, legislature, _, number, suffix = m.groups()
+    folder, prefix, provenance = UID_FAMILIES[family]
+    doc_id = f"{int(number):04d}{(suffix or '').lower()}"
+    return f"{SITE_URL}/dyn/old/{int(legislature)}/{folder}/{prefix}{doc_id}.asp", provenance
+
+# ----------------------------
+#  Lecture en flux des archives
+# ----------------------------
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _iter_xml_uids(stream):
+    for _, elem in ET.iterparse(stream, events=("end",)):
+        name = _local_name(elem.tag)
+        if name == "uid" and elem.text:
+            yield elem.text.strip()
+        elif name in ("document", "dossierParlementaire"):
+            elem.clear()
+
+
+def _walk_uids(node):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "uid" and isinstance(value, str):
+                yield value
+            else:
+                yield from _walk_uids(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk_uids(item)
+
+
+def _iter_json_uids(stream):
+    # Tous les champs "uid", quel que soit l'emballage (document,
+    # dossierParlementaire, export en un bloc) : uid_to_row filtre ensuite.
+    if ijson is not None:
+        for prefix, event, value in ijson.parse(stream):
+            if event == "string" and (prefix == "uid" or prefix.endswith(".uid")):
+                yield value
+        return
+    yield from _walk_uids(json.load(stream))
+
+
+def iter_archive_uids(archive_path):
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            with archive.open(info) as stream:
+                if info.filename.endswith(".xml"):
+                    yield from _iter_xml_uids(stream)
+                elif info.filename.endswith(".json"):
+                    yield from _iter_json_uids(stream)
+
+
+def download_archive(url, dest_dir):
+    path = os.path.join(dest_dir, os.path.basename(url))
+    with requests.get(url, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in r.iter_content(1024 * 1024):
+                f.write(chunk)
+    return path
+
+
+def ingest_archives(sources):
+    """
+    `sources` : chemins locaux ou URLs d'archives zip. Retourne un DataFrame
+    pandas (url, provenance), comme scrap_urls_all().
+    """
+    rows = {}
+    with tempfile.TemporaryDirectory(prefix="opendata_") as tmp_dir:
+        for source in sources:
+            path = download_archive(source, tmp_dir) if source.startswith("http") else source
+            n_uids = 0
+            for uid in iter_archive_uids(path):
+                n_uids += 1
+                row = uid_to_row(uid)
+                if row and row[0] not in rows:
+                    rows[row[0]] = row[1]
+            print(f"[OPEN DATA] {os.path.basename(path)} : {n_uids} UIDs lus, {len(rows)} documents cumulés")
+
+    return pd.DataFrame({"url": list(rows.keys()), "provenance": list(rows.values())})
+
+
+def default_sources(legislature=CURRENT_LEGISLATURE):
+    return [OPENDATA_ARCHIVE_URL.format(leg=legislature)]
+
+# ----------------------------
+#  Archive de test & benchmark
+# ----------------------------
+def make_fixture_archive(path, n_docs=10_000, legislature=CURRENT_LEGISLATURE):
+    """
+    Archive locale au format open data (JSON par document et par dossier,
+    UIDs au format réel, + un export XML).
+    """
+    families = ["PRJLANR5L{leg}B{n:04d}", "PIONANR5L{leg}B{n:04d}", "RAPPANR5L{leg}B{n:04d}", "TAANR5L{leg}TA{n:04d}"]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i in range(n_docs):
+            uid = families[i % 4].format(leg=legislature, n=i // 4 + 1)
+            archive.writestr(f"json/document/{uid}.json", json.dumps({"document": {"uid": uid, "legislature": str(legislature)}}))
+        for i in range(n_docs // 50):
+            dossier = {"dossierParlementaire": {"uid": f"DLR5L{legislature}N{i:05d}", "legislature": str(legislature)}}
+            archive.writestr(f"json/dossierParlementaire/DLR5L{legislature}N{i:05d}.json", json.dumps(dossier))
+        xml_docs = "".join(
+            f"<document><uid>{families[i % 4].format(leg=legislature, n=n_docs + i)}</uid></document>"
+            for i in range(n_docs // 10)
+        )
+        archive.writestr(
+            "xml/documents.xml",
+            f'<export xmlns="http://schemas.assemblee-nationale.fr/referentiel"><textesLegislatifs>{xml_docs}</textesLegislatifs></export>'
+        )
+    return path
+
+
+def benchmark(sources, with_selenium=False):
+    start = time.time()
+    df = ingest_archives(sources)
+    ingest_s = time.time() - start
+    print(f"Open data : {len(df)} documents en {ingest_s:.1f}s")
+
+    if with_selenium:
+        from scrap_urls_all import scrap_urls_all
+        start = time.time()
+        crawled = scrap_urls_all()
+        crawl_s = time.time() - start
+        print(f"Selenium  : {len(crawled)} documents en {crawl_s:.0f}s (x{crawl_s / max(ingest_s, 1e-6):.0f})")
+        missing = set(crawled["url"]) - set(df["url"])
+        print(f"URLs du crawl absentes de l'open data : {len(missing)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion des archives open data de l'Assemblée.")
+    parser.add_argument("sources", nargs="*", help="Archives zip (chemins ou URLs) ; défaut : législature courante")
+    parser.add_argument("--fixture", help="Génère une archive de test à ce chemin et l'utilise")
+    parser.add_argument("--fixture-docs", type=int, default=10_000)
+    parser.add_argument("--with-selenium", action="store_true", help="Compare avec le crawl Selenium complet")
+    args = parser.parse_args()
+
+    sources = args.sources or default_sources()
+    if args.fixture:
+        sources = [make_fixture_archive(args.fixture, args.fixture_docs)]
+    benchmark(sources, args.with_selenium)
@@ -0,0 +1,160 @@
+import re
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import polars as pl
+
+from db_store import fetch_db, commit_db
+from doc_identity import split_pdf_name
+
+# ----------------------------
+#  Catalogue des métadonnées PDF
+# ----------------------------
+# pdf_catalog.parquet, à côté de db_urls.parquet : une ligne par PDF du Cloud
+# (pages, taille, titre, auteur, date de création, producteur). Rempli au
+# passage par les deux lectures PyPDF2 existantes (extract_text.py et
+# verif_pdfs_db.py) : aucun PDF n'est relu pour le catalogue.
+#
+# Statistiques : pl.read_parquet("pdf_catalog.parquet") puis requêtes Polars,
+# sans aucune lecture dans le bucket (voir `python pdf_catalog.py stats`).
+
+CATALOG_FILENAME = "pdf_catalog.parquet"
+
+CATALOG_SCHEMA = {
+    "pdf_name": pl.String,
+    "doc_type": pl.String,
+    "content_hash": pl.String,
+    "n_pages": pl.Int32,
+    "size_bytes": pl.Int64,
+    "title": pl.String,
+    "author": pl.String,
+    "creation_date": pl.Datetime("us", "UTC"),
+    "producer": pl.String,
+    "cataloged_at": pl.String,
+}
+
+# D:YYYYMMDDHHmmSS+HH'mm' (tout est optionnel après l'année)
+PDF_DATE_PATTERN = re.compile(
+    r"D:(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?(?:([Z+-])(\d{2})?'?(\d{2})?'?)?"
+)
+
+
+def parse_pdf_date(value):
+    m = PDF_DATE_PATTERN.match(str(value or "").strip())
+    if not m:
+        return None
+    year, month, day, hour, minute, second, sign, tz_h, tz_m = m.groups()
+    try:
+        dt = datetime(int(year), int(month or 1), int(day or 1),
+                      int(hour or 0), int(minute or 0), int(second or 0))
+    except ValueError:
+        return None
+    offset = timedelta(hours=int(tz_h or 0), minutes=int(tz_m or 0))
+    if sign == "-":
+        offset = -offset
+    return dt.replace(tzinfo=timezone(offset)).astimezone(timezone.utc)
+
+
+def _clean_text(value):
+    if value is None:
+        return None
+    text = str(value).replace("\x00", "").strip()
+    return text or None
+
+
+def pdf_metadata(reader, size_bytes):
+    """
+    Métadonnées d'un PdfReader déjà ouvert (sans coût de parsing supplémentaire
+    hors du dictionnaire /Info).
+    """
+    try:
+        info = reader.metadata
+    except Exception:
+        info = None
+
+    # .title/.author/.producer et info[...] résolvent les objets indirects
+    # (info.get() renverrait un IndirectObject)
+    return {
+        "n_pages": len(reader.pages),
+        "size_bytes": size_bytes,
+        "title": _clean_text(info.title) if info is not None else None,
+        "author": _clean_text(info.author) if info is not None else None,
+        "creation_date": parse_pdf_date(info["/CreationDate"])
+                         if info is not None and "/CreationDate" in info else None,
+        "producer": _clean_text(info.producer) if info is not None else None,
+    }
+
+
+def catalog_row(pdf_name, content_hash, metadata):
+    doc_type, _ = split_pdf_name(pdf_name)
+    return {
+        "pdf_name": pdf_name,
+        "doc_type": doc_type,
+        "content_hash": content_hash,
+        **metadata,
+        "cataloged_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+# ----------------------------
+#  Lecture / écriture (mêmes garanties que la DB, voir db_store.py)
+# ----------------------------
+def empty_catalog():
+    return pl.DataFrame(schema=CATALOG_SCHEMA)
+
+
+def _read_catalog(path, log=print):
+    return pl.read_parquet(path)
+
+
+def _write_catalog(df, path):
+    df.write_parquet(path, compression="zstd")
+
+
+def fetch_catalog(log=print):
+    df, _ = fetch_db(log, CATALOG_FILENAME, read=_read_catalog, empty=empty_catalog)
+    return df
+
+
+def upsert_catalog(rows, log=print):
+    """
+    Remplace (par pdf_name) les lignes données dans le catalogue distant.
+    """
+    if not rows:
+        return
+    updated = pl.DataFrame(rows, schema=CATALOG_SCHEMA)
+
+    def merge(base_df):
+        return pl.concat([
+            base_df.filter(~pl.col("pdf_name").is_in(updated["pdf_name"])),
+            updated,
+        ])
+
+    commit_db(merge, log, key=CATALOG_FILENAME, read=_read_catalog, write=_write_catalog, empty=empty_catalog)
+    log(f"[CATALOGUE] {updated.height} PDFs catalogués")
+
+# ----------------------------
+#  Statistiques du corpus
+# ----------------------------
+def corpus_stats(catalog):
+    return (
+        catalog.group_by("doc_type")
+               .agg(
+                   pl.len().alias("pdfs"),
+                   pl.col("n_pages").sum().alias("pages"),
+                   pl.col("n_pages").median().alias("pages_median"),
+                   (pl.col("size_bytes").sum() / 1e6).round(1).alias("taille_mo"),
+                   pl.col("creation_date").min().alias("plus_ancien"),
+                   pl.col("creation_date").max().alias("plus_recent"),
+                   pl.col("producer").mode().first().alias("producteur_principal"),
+               )
+               .sort("pdfs", descending=True)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Catalogue des métadonnées PDF.")
+    parser.add_argument("command", choices=["stats"])
+    args = parser.parse_args()
+
+    with pl.Config(tbl_rows=50, tbl_cols=20):
+        print(corpus_stats(fetch_catalog()))
@@ -0,0 +1,142 @@
+import threading
+from collections import defaultdict
+
+import requests
+
+from doc_identity import extract_id, extract_legislature
+
+BASE_URL = "https://www.assemblee-nationale.fr"
+
+# ----------------------------
+#  Dérivation directe de l'URL du PDF
+# ----------------------------
+# Pour les familles /dyn/old/<leg>/{projets,propositions,rapports,ta}/ le lien
+# PDF se déduit de l'identifiant du document : on tente d'abord ces URLs
+# (GET partiel de 5 octets, on vérifie la signature %PDF) et on ne retombe sur
+# le scraping HTML de la page que si aucune ne répond.
+#
+# Les gabarits sont essayés dans l'ordre. {page} est l'URL de la page sans
+# l'extension .asp, {leg} la législature, {num} la partie numérique de l'ID.
+FAMILY_TEMPLATES = {
+    "projet_loi": [
+        "{page}.pdf",
+        BASE_URL + "/dyn/opendata/PRJLANR5L{leg}B{num:04d}.pdf",
+    ],
+    "proposition_loi": [
+        "{page}.pdf",
+        BASE_URL + "/dyn/opendata/PIONANR5L{leg}B{num:04d}.pdf",
+    ],
+    "rapport_legislatif": [
+        "{page}.pdf",
+        BASE_URL + "/dyn/opendata/RAPPANR5L{leg}B{num:04d}.pdf",
+    ],
+    "texte_adopte": [
+        "{page}.pdf",
+        BASE_URL + "/dyn/opendata/TAANR5L{leg}TA{num:04d}.pdf",
+    ],
+}
+
+# Une famille dont les dérivations n'aboutissent jamais est désactivée pour le
+# reste du run, afin de ne pas payer des requêtes inutiles avant chaque fallback.
+MIN_ATTEMPTS_BEFORE_DISABLE = 20
+
+session = requests.Session()
+session.headers.update({"Range": "bytes=0-4"})
+
+
+class ResolverStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = defaultdict(int)
+        self.hits = defaultdict(int)
+        self.hits_by_template = defaultdict(int)
+        self.fallbacks = defaultdict(int)
+        self.skipped = defaultdict(int)
+
+    def record(self, family, template_idx=None):
+        with self._lock:
+            self.attempts[family] += 1
+            if template_idx is None:
+                self.fallbacks[family] += 1
+            else:
+                self.hits[family] += 1
+                self.hits_by_template[(family, template_idx)] += 1
+
+    def record_skipped(self, family):
+        # Famille désactivée : pas de tentative de dérivation, mais la page
+        # HTML est tout de même récupérée.
+        with self._lock:
+            self.fallbacks[family] += 1
+            self.skipped[family] += 1
+
+    def is_disabled(self, family):
+        with self._lock:
+            return self.attempts[family] >= MIN_ATTEMPTS_BEFORE_DISABLE and self.hits[family] == 0
+
+    def summary(self):
+        lines = []
+        for family in sorted(self.attempts):
+            attempts, hits = self.attempts[family], self.hits[family]
+            by_template = ", ".join(
+                f"#{idx}={count}" for (fam, idx), count in sorted(self.hits_by_template.items()) if fam == family
+            )
+            lines.append(
+                f"{family}: {hits}/{attempts} dérivés ({hits / attempts:.0%}), "
+                f"{self.fallbacks[family]} pages HTML récupérées"
+                + (f" (dont {self.skipped[family]} après désactivation)" if self.skipped[family] else "")
+                + (f" [{by_template}]" if by_template else "")
+            )
+        return lines
+
+
+stats = ResolverStats()
+
+
+def candidate_urls(page_url):
+    doc_type, doc_id = extract_id(page_url)
+    templates = FAMILY_TEMPLATES.get(doc_type)
+    if not templates or not doc_id or "/dyn/old/" not in page_url or not page_url.endswith(".asp"):
+        return doc_type, []
+
+    legislature = extract_legislature(page_url)
+    num = int(doc_id) if doc_id.isdigit() else None
+    candidates = []
+    for idx, template in enumerate(templates):
+        if "{num" in template and (num is None or legislature is None):
+            continue
+        candidates.append((idx, template.format(page=page_url[:-len(".asp")], leg=legislature, num=num or 0)))
+    return doc_type, candidates
+
+
+def is_pdf_url(pdf_url):
+    try:
+        r = session.get(pdf_url, timeout=10, stream=True)
+        try:
+            if r.status_code not in (200, 206):
+                return False
+            return next(r.iter_content(5), b"")[:5] == b"%PDF-"
+        finally:
+            r.close()
+    except requests.RequestException:
+        return False
+
+
+def resolve_pdf_link(page_url, fallback):
+    """
+    Même contrat que get_pdf_link ("404", "no_link", None ou URL du PDF) ;
+    `fallback` est appelé avec page_url si la dérivation échoue.
+    """
+    family, candidates = candidate_urls(page_url)
+    if not candidates:
+        return fallback(page_url)
+    if stats.is_disabled(family):
+        stats.record_skipped(family)
+        return fallback(page_url)
+
+    for idx, pdf_url in candidates:
+        if is_pdf_url(pdf_url):
+            stats.record(family, idx)
+            return pdf_url
+
+    stats.record(family, None)
+    return fallback(page_url)
@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import tempfile
+import threading
+from datetime import datetime
+from collections import Counter
+from contextlib import contextmanager
+
+# ----------------------------
+#  Profilage optionnel par étape
+# ----------------------------
+# Désactivé par défaut : profile_stage() ne coûte alors qu'un test.
+# Activation : --profile[=sample] ou PIPELINE_PROFILE=cprofile|sample.
+#  - cprofile : profilage déterministe du thread appelant → <étape>.pstats
+#               (snakeviz, `python -m pstats`)
+#  - sample   : échantillonnage de tous les threads (crawl + workers de
+#               téléchargement) → <étape>.collapsed (flamegraph.pl, speedscope)
+# Les processus enfants (pool d'extraction de texte) ne sont pas couverts.
+
+PROFILE_MODES = ("cprofile", "sample")
+SAMPLE_INTERVAL = float(os.getenv("PIPELINE_PROFILE_INTERVAL", 0.005))
+RUN_ID = datetime.now().strftime("%Y-%m-%d_%H-%M")
+
+
+def _mode_from_switches():
+    for arg in sys.argv[1:]:
+        if arg == "--profile":
+            return "cprofile"
+        if arg.startswith("--profile="):
+            return arg.split("=", 1)[1]
+    return os.getenv("PIPELINE_PROFILE") or None
+
+
+PROFILE_MODE = _mode_from_switches()
+if PROFILE_MODE is not None and PROFILE_MODE not in PROFILE_MODES:
+    raise ValueError(f"Mode de profilage inconnu : {PROFILE_MODE} (attendu : {', '.join(PROFILE_MODES)})")
+
+PROFILE_DIR = os.path.join(tempfile.gettempdir(), "scraping_lois_profiles", RUN_ID)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+class StackSampler:
+    """
+    Relève périodiquement la pile de chaque thread et compte les piles identiques.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile_stage(name, log=print):
+    if PROFILE_MODE is None:
+        yield
+        return
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    start = time.time()
+    if PROFILE_MODE == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler()
+        profiler.start()
+    try:
+        yield
+    finally:
+        if PROFILE_MODE == "cprofile":
+            profiler.disable()
+            path = os.path.join(PROFILE_DIR, f"{name}.pstats")
+            profiler.dump_stats(path)
+            top = pstats.Stats(profiler).sort_stats("cumulative")
+            log(f"[PROFIL] {name} : {time.time() - start:.1f}s, {top.total_calls} appels → {path}")
+        else:
+            profiler.stop()
+            path = os.path.join(PROFILE_DIR, f"{name}.collapsed")
+            profiler.write_collapsed(path)
+            log(f"[PROFIL] {name} : {time.time() - start:.1f}s, "
+                f"{sum(profiler.stacks.values())} échantillons → {path}")
+
+
+def upload_profiles(log_prefix, log=print):
+    """
+    Envoie les profils de ce run à côté du log : <log_prefix>/profiles/<run>/.
+    """
+    if PROFILE_MODE is None or not os.path.isdir(PROFILE_DIR):
+        return
+    from storage import get_storage
+    storage = get_storage()
+    for filename in sorted(os.listdir(PROFILE_DIR)):
+        key = f"{log_prefix}/profiles/{RUN_ID}/{filename}"
+        storage.upload_file(os.path.join(PROFILE_DIR, filename), key)
+        log(f"[PROFIL] ☁️ {key}")
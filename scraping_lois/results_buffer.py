@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import shutil
+import resource
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+
+import polars as pl
+
+# ----------------------------
+#  Tampon des résultats de téléchargement
+# ----------------------------
+# Les résultats ({url, status, filename} et validateurs HTTP du PDF) sont
+# écrits par paquets dans des fichiers parquet au lieu de s'accumuler dans une
+# liste Python : la mémoire reste bornée par `chunk_size` quelle que soit la
+# taille du backlog, et l'étape 5 joint directement contre scan().
+
+RESULT_SCHEMA = {
+    "url": pl.String,
+    "status": pl.String,
+    "filename": pl.String,
+    "pdf_url": pl.String,
+    "content_length": pl.Int64,
+    "last_modified": pl.String,
+    "etag": pl.String,
+}
+CHUNK_SIZE = 5000
+
+
+class ResultsBuffer:
+    def __init__(self, directory=None, chunk_size=CHUNK_SIZE):
+        self.directory = directory or tempfile.mkdtemp(prefix="dl_results_")
+        os.makedirs(self.directory, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.counts = Counter()
+        self._rows = []
+        self._parts = 0
+        self._lock = threading.Lock()
+
+    def append(self, result):
+        with self._lock:
+            self._rows.append(result)
+            self.counts[result["status"]] += 1
+            if len(self._rows) >= self.chunk_size:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._rows:
+            return
+        path = os.path.join(self.directory, f"part-{self._parts:05d}.parquet")
+        pl.DataFrame(self._rows, schema=RESULT_SCHEMA).write_parquet(path)
+        self._parts += 1
+        self._rows = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def scan(self):
+        """
+        LazyFrame de tous les résultats (un seul par URL : le dernier).
+        """
+        self.flush()
+        if self._parts == 0:
+            return pl.LazyFrame(schema=RESULT_SCHEMA)
+        return (
+            pl.scan_parquet(os.path.join(self.directory, "*.parquet"))
+              .unique(subset="url", keep="last", maintain_order=True)
+        )
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+# ----------------------------
+#  Mesure mémoire : liste de dicts vs tampon parquet
+# ----------------------------
+# Chemin réel de l'étape 4 → 5 : download_new_pdfs (process_row remplacé par un
+# résultat synthétique, sans réseau) puis apply_download_results sur une DB de
+# même taille. Seul le conteneur des résultats change : liste Python (ancien
+# fonctionnement) ou ResultsBuffer.
+
+BENCHMARK_SIZES = (10_000, 100_000, 300_000)
+
+
+def _synthetic_rows(n):
+    for i in range(n):
+        url = f"https://www.assemblee-nationale.fr/dyn/old/17/propositions/pion{i}.asp"
+        yield {"url": url, "provenance": "propositions_lois"}
+
+
+def _fake_process_row(row, pdf_dir, log):
+    i = int(row["url"].rsplit("pion", 1)[1].split(".")[0])
+    if i % 10 == 0:
+        return {"url": row["url"], "status": "404", "filename": None}
+    return {
+        "url": row["url"], "status": "success", "filename": f"proposition_loi_{i}.pdf",
+        "pdf_url": row["url"].replace(".asp", ".pdf"), "content_length": 100_000 + i,
+        "last_modified": "Mon, 06 Jan 2025 10:00:00 GMT", "etag": f'"{i:032x}"',
+    }
+
+
+def _run_mode(mode, n):
+    import download_pdfs
+    from db_updates import new_db_entries, apply_download_results
+
+    download_pdfs.process_row = _fake_process_row
+    new_df = pl.DataFrame(list(_synthetic_rows(n)))
+    db_df = new_db_entries(new_df, set(new_df["url"].to_list()), "2025-01-01")
+    del new_df
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        if mode == "list":
+            results = download_pdfs.download_new_pdfs(_synthetic_rows(n), pdf_dir, lambda *_: None, results=[])
+            final = apply_download_results(db_df, pl.LazyFrame(results, schema=RESULT_SCHEMA))
+        else:
+            results = download_pdfs.download_new_pdfs(_synthetic_rows(n), pdf_dir, lambda *_: None)
+            final = apply_download_results(db_df, results.scan())
+            results.cleanup()
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode} {final['downloaded'].sum()} {baseline_kb} {peak_kb}")
+
+
+def benchmark_memory(sizes=BENCHMARK_SIZES):
+    """
+    Chaque mesure tourne dans un processus neuf (ru_maxrss n'est jamais remis à
+    zéro) ; la croissance est comptée à partir de la DB chargée.
+    """
+    for n in sizes:
+        print(f"{n} lignes synthétiques")
+        for mode in ("list", "buffer"):
+            start = time.time()
+            out = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--rows", str(n)],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+            _, downloaded, baseline_kb, peak_kb = out[-4:]
+            print(f"   {mode:6} : pic RSS {int(peak_kb) / 1024:.0f} Mo "
+                  f"(+{(int(peak_kb) - int(baseline_kb)) / 1024:.0f} Mo), "
+                  f"{downloaded} téléchargés, {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Mesure mémoire de l'étape de téléchargement.")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(BENCHMARK_SIZES))
+    parser.add_argument("--mode", choices=["list", "buffer"], default=None)
+    args = parser.parse_args()
+    if args.mode:
+        _run_mode(args.mode, args.rows[0])
+    else:
+        benchmark_memory(args.rows)
@@ -0,0 +1,155 @@
+import os
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import polars as pl
+
+import pdf_url_resolver
+from db_store import fetch_db, commit_db
+from db_updates import apply_revalidation
+from download_pdfs import download_pdf, get_pdf_link, response_validators
+from extract_text import extract_new_texts
+from results_buffer import ResultsBuffer
+
+# ----------------------------
+#  Revalidation des PDFs déjà téléchargés
+# ----------------------------
+# L'Assemblée republie parfois un PDF corrigé à la même URL. Chaque nuit, une
+# fenêtre glissante de PDFs (les moins récemment vérifiés d'abord) est sondée
+# par HEAD et comparée aux validateurs relevés au téléchargement
+# (Content-Length / Last-Modified / ETag) ; seuls les PDFs modifiés sont
+# re-téléchargés. Coût : quelques centaines d'octets par document.
+#
+# Les lignes antérieures aux validateurs (pdf_url vide) sont d'abord résolues
+# une fois (page → lien PDF) et reçoivent une référence, sans re-téléchargement.
+
+REVALIDATE_BATCH = int(os.getenv("REVALIDATE_BATCH", 2000))
+WORKERS = 8
+TMP_PDF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "pdf")
+
+
+def revalidation_window(df, batch=REVALIDATE_BATCH):
+    return (
+        df.filter(pl.col("downloaded") == True)
+          .sort("checked_at", nulls_last=False)
+          .head(batch)
+    )
+
+
+def probe_validators(pdf_url, stored):
+    """
+    HEAD du PDF ; GET conditionnel (corps jamais lu) si HEAD n'est pas supporté.
+    Retourne (statut HTTP, validateurs).
+    """
+    r = requests.head(pdf_url, timeout=20, allow_redirects=True)
+    if r.status_code in (405, 501):
+        headers = {}
+        if stored.get("etag"):
+            headers["If-None-Match"] = stored["etag"]
+        if stored.get("last_modified"):
+            headers["If-Modified-Since"] = stored["last_modified"]
+        with requests.get(pdf_url, timeout=20, headers=headers, stream=True) as r:
+            if r.status_code == 304:
+                return 304, {}
+            return r.status_code, response_validators(r)
+    return r.status_code, response_validators(r)
+
+
+def has_changed(stored, current):
+    """
+    Vrai si un validateur présent des deux côtés diffère.
+    """
+    for name in ("etag", "last_modified", "content_length"):
+        if stored.get(name) is not None and current.get(name) is not None and stored[name] != current[name]:
+            return True
+    return False
+
+
+def revalidate_row(row, pdf_dir, log):
+    url = row["url"]
+    result = {"url": url, "status": "error", "filename": row["pdf_name"]}
+    try:
+        pdf_url = row["pdf_url"]
+        baseline = pdf_url is None
+        if baseline:
+            pdf_url = pdf_url_resolver.resolve_pdf_link(url, get_pdf_link)
+            if pdf_url in ("404", "no_link", None):
+                result["status"] = pdf_url or "error"
+                return result
+
+        status_code, current = probe_validators(pdf_url, row)
+        if status_code == 304:
+            return {**result, "status": "unchanged", **{k: row[k] for k in ("pdf_url", "content_length", "last_modified", "etag")}}
+        if status_code == 404:
+            result["status"] = "404"
+            return result
+        if status_code >= 400:
+            return result
+
+        if baseline or not has_changed(row, current):
+            return {**result, "status": "baseline" if baseline else "unchanged", **current}
+
+        log(f"[REVALIDATION] 🔄 {row['pdf_name']} modifié, re-téléchargement")
+        filename, validators = download_pdf(row["doc_type"], row["doc_id"], pdf_url, pdf_dir, log, row["legislature"])
+        if filename:
+            return {**result, "status": "changed", "filename": filename, **validators}
+        result["status"] = "dl_failed"
+        return result
+    except Exception as e:
+        log(f"[REVALIDATION] ⚠️ {url} : {e}")
+        return result
+
+
+def revalidate_pdfs(batch=REVALIDATE_BATCH, workers=WORKERS, pdf_dir=TMP_PDF_DIR, log=print):
+    os.makedirs(pdf_dir, exist_ok=True)
+    df, db_etag = fetch_db(log)
+    window = revalidation_window(df, batch)
+    log(f"[REVALIDATION] {window.height} PDFs sondés (sur {df.filter(pl.col('downloaded') == True).height} téléchargés)")
+
+    results = ResultsBuffer()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(lambda row: revalidate_row(row, pdf_dir, log), window.iter_rows(named=True)):
+            results.append(result)
+
+    counts = results.counts
+    log(f"[REVALIDATION] inchangés: {counts['unchanged']}, modifiés: {counts['changed']}, "
+        f"références créées: {counts['baseline']}, 404: {counts['404']}, "
+        f"erreurs: {counts['error'] + counts['dl_failed'] + counts['no_link']}")
+
+    unchanged_bytes = (
+        results.scan()
+               .filter(pl.col("status") == "unchanged")
+               .select(pl.col("content_length").sum())
+               .collect()
+               .item()
+    )
+    log(f"[REVALIDATION] {(unchanged_bytes or 0) / 1e6:.1f} Mo de re-téléchargement évités")
+
+    commit_db(lambda base_df: apply_revalidation(base_df, results.scan()), log, base=(df, db_etag))
+
+    changed = (
+        results.scan()
+               .filter(pl.col("status") == "changed")
+               .select("filename")
+               .collect()
+               .get_column("filename")
+               .to_list()
+    )
+    if changed:
+        extract_new_texts(changed, log)
+    results.cleanup()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Revalidation des PDFs déjà téléchargés (fenêtre glissante).")
+    parser.add_argument("--batch", type=int, default=REVALIDATE_BATCH, help="Nombre de PDFs sondés par passe")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    def log(message):
+        print(f"{datetime.now().isoformat()} — {message}")
+
+    revalidate_pdfs(args.batch, args.workers, log=log)
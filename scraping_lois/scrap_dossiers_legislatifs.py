@@ -1,14 +1,22 @@
-import time
 import pandas as pd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-def scrap_dossiers_legislatifs(driver):
+from crawl_profile import navigation_started, page_loaded, pause, record_page
+from legislatures import CURRENT_LEGISLATURE, dossiers_url
+
+def iter_dossiers_legislatifs(driver, legislature=CURRENT_LEGISLATURE):
+    """
+    Générateur : produit les URLs de chaque page dès qu'elle est lue.
+    """
     wait = WebDriverWait(driver, 10)
+    buttons_locator = (By.XPATH, "//a[contains(@class,'button') and contains(@class,'_colored-white')]")
 
-    url = 'https://www.assemblee-nationale.fr/dyn/17/dossiers'
+    url = dossiers_url(legislature)
+    navigation_started(driver)
     driver.get(url)
+    page_loaded(driver, buttons_locator)
 
     all_urls = []
     page_num = 1
@@ -16,20 +24,14 @@ def scrap_dossiers_legislatifs(driver):
     while True:
         print(f"\n========== DOSSIERS LÉGISLATIFS — PAGE {page_num} ==========")
 
-        wait.until(
-            EC.presence_of_element_located(
-                (By.XPATH, "//a[contains(@class,'button') and contains(@class,'_colored-white')]")
-            )
-        )
+        wait.until(EC.presence_of_element_located(buttons_locator))
 
-        time.sleep(1)
+        pause(driver, 1)
 
-        buttons = driver.find_elements(
-            By.XPATH, "//a[contains(@class,'button') and contains(@class,'_colored-white')]"
-        )
+        buttons = driver.find_elements(*buttons_locator)
 
         urls = [b.get_attribute("href") for b in buttons]
-        textes = [u for u in urls if u and "/dyn/17/textes/" in u]
+        textes = [u for u in urls if u and f"/dyn/{legislature}/textes/" in u]
 
         print("URLs trouvées sur cette page :")
         for u in textes:
@@ -39,6 +41,10 @@ def scrap_dossiers_legislatifs(driver):
 
         print(f"Total cumulé : {len(all_urls)}")
 
+        record_page(driver)
+
+        yield textes
+
         try:
             next_btn = driver.find_element(
                 By.XPATH,
@@ -48,14 +54,22 @@ def scrap_dossiers_legislatifs(driver):
             if not next_btn.is_displayed():
                 break
 
+            navigation_started(driver, buttons[0] if buttons else next_btn)
             driver.execute_script("arguments[0].click();", next_btn)
+            page_loaded(driver, buttons_locator)
             page_num += 1
-            time.sleep(5)
+            pause(driver, 5)
 
         except:
             print("\n>>> Fin du scraping DOSSIER LÉGISLATIF.")
             break
 
+
+def scrap_dossiers_legislatifs(driver, legislature=CURRENT_LEGISLATURE):
+    all_urls = []
+    for urls in iter_dossiers_legislatifs(driver, legislature):
+        all_urls.extend(urls)
+
     df = pd.DataFrame({
         "url": list(set(all_urls)),
         "provenance": "dossiers_legislatifs"
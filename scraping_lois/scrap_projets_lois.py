@@ -1,14 +1,22 @@
-import time
 import pandas as pd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-def scrap_projets_lois(driver):
+from crawl_profile import navigation_started, page_loaded, pause, record_page
+from legislatures import CURRENT_LEGISLATURE, listing_url
+
+def iter_projets_lois(driver, legislature=CURRENT_LEGISLATURE):
+    """
+    Générateur : produit les URLs de chaque page dès qu'elle est lue.
+    """
     wait = WebDriverWait(driver, 10)
+    links_locator = (By.XPATH, f"//a[contains(@href, '/dyn/old/{legislature}/projets/')]")
 
-    url = "https://www2.assemblee-nationale.fr/documents/liste/(type)/projets-loi"
+    url = listing_url("projets-loi", legislature)
+    navigation_started(driver)
     driver.get(url)
+    page_loaded(driver, links_locator)
 
     all_urls = []
     page_num = 1
@@ -17,11 +25,9 @@ def scrap_projets_lois(driver):
         print(f"\n========== PROJETS DE LOI — PAGE {page_num} ==========")
 
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "a")))
-        time.sleep(3)
+        pause(driver, 3)
 
-        links = driver.find_elements(
-            By.XPATH, "//a[contains(@href, '/dyn/old/17/projets/')]"
-        )
+        links = driver.find_elements(*links_locator)
 
         urls = [l.get_attribute("href") for l in links]
 
@@ -33,17 +39,27 @@ def scrap_projets_lois(driver):
 
         all_urls.extend(urls)
         print(f"Total cumulé : {len(all_urls)}")
+        record_page(driver)
+        yield urls
 
         try:
             next_btn = driver.find_element(By.XPATH, "//li[contains(@class,'next')]/a")
+            navigation_started(driver, links[0] if links else next_btn)
             driver.execute_script("arguments[0].click();", next_btn)
+            page_loaded(driver, links_locator)
             page_num += 1
-            time.sleep(5)
+            pause(driver, 5)
 
         except Exception:
             print("\n>>> Fin du scraping PROJETS DE LOI.")
             break
 
+
+def scrap_projets_lois(driver, legislature=CURRENT_LEGISLATURE):
+    all_urls = []
+    for urls in iter_projets_lois(driver, legislature):
+        all_urls.extend(urls)
+
     df = pd.DataFrame({
         "url": list(set(all_urls)),  
         "provenance": "projets_lois"
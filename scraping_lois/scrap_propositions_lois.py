@@ -1,15 +1,23 @@
-import time
 import pandas as pd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from crawl_profile import navigation_started, page_loaded, pause, record_page
+from legislatures import CURRENT_LEGISLATURE, listing_url
 
-def scrap_propositions_lois(driver):
+
+def iter_propositions_lois(driver, legislature=CURRENT_LEGISLATURE):
+    """
+    Générateur : produit les URLs de chaque page dès qu'elle est lue.
+    """
     wait = WebDriverWait(driver, 10)
+    links_locator = (By.XPATH, f"//a[contains(@href, '/dyn/old/{legislature}/propositions')]")
 
-    url = "https://www2.assemblee-nationale.fr/documents/liste/(type)/propositions-loi"
+    url = listing_url("propositions-loi", legislature)
+    navigation_started(driver)
     driver.get(url)
+    page_loaded(driver, links_locator)
 
     all_urls = []
     page_num = 1
@@ -18,11 +26,9 @@ def scrap_propositions_lois(driver):
         print(f"\n========== PROPOSITIONS DE LOI — PAGE {page_num} ==========")
 
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "a")))
-        time.sleep(1)
+        pause(driver, 1)
 
-        links = driver.find_elements(
-            By.XPATH, "//a[contains(@href, '/dyn/old/17/propositions')]"
-        )
+        links = driver.find_elements(*links_locator)
 
         urls = [l.get_attribute("href") for l in links]
 
@@ -34,6 +40,8 @@ def scrap_propositions_lois(driver):
 
         all_urls.extend(urls)
         print(f"TOTAL cumulé : {len(all_urls)}")
+        record_page(driver)
+        yield urls
 
         old_links = links
 
@@ -44,18 +52,26 @@ def scrap_propositions_lois(driver):
             )
 
             print("→ Clic sur 'Suivant »'")
+            navigation_started(driver, old_links[0] if old_links else next_btn)
             driver.execute_script("arguments[0].click();", next_btn)
+            page_loaded(driver, links_locator)
 
             if old_links:
                 wait.until(EC.staleness_of(old_links[0]))
 
-            time.sleep(5)
+            pause(driver, 5)
             page_num += 1
 
         except Exception:
             print("\n>>> Plus de bouton 'Suivant'. Fin du scraping.")
             break
 
+
+def scrap_propositions_lois(driver, legislature=CURRENT_LEGISLATURE):
+    all_urls = []
+    for urls in iter_propositions_lois(driver, legislature):
+        all_urls.extend(urls)
+
     df = pd.DataFrame({
         "url": list(set(all_urls)),  
         "provenance": "propositions_lois"
@@ -1,15 +1,23 @@
-import time
 import pandas as pd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from crawl_profile import navigation_started, page_loaded, pause, record_page
+from legislatures import CURRENT_LEGISLATURE, listing_url
 
-def scrap_rapports_legislatifs(driver):
+
+def iter_rapports_legislatifs(driver, legislature=CURRENT_LEGISLATURE):
+    """
+    Générateur : produit les URLs de chaque page dès qu'elle est lue.
+    """
     wait = WebDriverWait(driver, 10)
+    links_locator = (By.XPATH, f"//a[contains(@href, '/dyn/old/{legislature}/rapports/')]")
 
-    url = "https://www2.assemblee-nationale.fr/documents/liste/(type)/rapports"
+    url = listing_url("rapports", legislature)
+    navigation_started(driver)
     driver.get(url)
+    page_loaded(driver, links_locator)
 
     all_urls = []
     page_num = 1
@@ -24,11 +32,9 @@ def scrap_rapports_legislatifs(driver):
         print(f"\n========== RAPPORTS — PAGE {page_num} ==========")
 
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "a")))
-        time.sleep(1)
+        pause(driver, 1)
 
-        links = driver.find_elements(
-            By.XPATH, "//a[contains(@href, '/dyn/old/17/rapports/')]"
-        )
+        links = driver.find_elements(*links_locator)
 
         urls = [l.get_attribute("href") for l in links]
         urls = list(dict.fromkeys(urls))  
@@ -44,6 +50,10 @@ def scrap_rapports_legislatifs(driver):
 
         print(f"TOTAL cumulé : {len(all_urls)}")
 
+        record_page(driver)
+
+        yield urls
+
         try:
             next_btn = driver.find_element(
                 By.XPATH,
@@ -60,15 +70,23 @@ def scrap_rapports_legislatifs(driver):
             break
 
         print("→ Clic sur Suivant")
+        navigation_started(driver, links[0] if links else next_btn)
         driver.execute_script("arguments[0].click();", next_btn)
+        page_loaded(driver, links_locator)
 
         last_offset = next_href
         page_num += 1
 
-        time.sleep(5)
+        pause(driver, 5)
+
+
+def scrap_rapports_legislatifs(driver, legislature=CURRENT_LEGISLATURE):
+    all_urls = []
+    for urls in iter_rapports_legislatifs(driver, legislature):
+        all_urls.extend(urls)
 
     df = pd.DataFrame({
-        "url": all_urls,
+        "url": list(dict.fromkeys(all_urls)),
         "provenance": "rapports_legislatifs"
     })
 
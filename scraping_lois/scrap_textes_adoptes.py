@@ -1,15 +1,23 @@
-import time
 import pandas as pd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from crawl_profile import navigation_started, page_loaded, pause, record_page
+from legislatures import CURRENT_LEGISLATURE, listing_url
 
-def scrap_textes_adoptes(driver):
+
+def iter_textes_adoptes(driver, legislature=CURRENT_LEGISLATURE):
+    """
+    Générateur : produit les URLs de chaque page dès qu'elle est lue.
+    """
     wait = WebDriverWait(driver, 10)
+    links_locator = (By.XPATH, f"//a[contains(@href, '/dyn/old/{legislature}/ta/')]")
 
-    url = "https://www2.assemblee-nationale.fr/documents/liste/(type)/ta"
+    url = listing_url("ta", legislature)
+    navigation_started(driver)
     driver.get(url)
+    page_loaded(driver, links_locator)
 
     all_urls = []
     page_num = 1
@@ -24,11 +32,9 @@ def scrap_textes_adoptes(driver):
         print(f"\n========== TEXTES ADOPTÉS — PAGE {page_num} ==========")
 
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "a")))
-        time.sleep(5)
+        pause(driver, 5)
 
-        links = driver.find_elements(
-            By.XPATH, "//a[contains(@href, '/dyn/old/17/ta/')]"
-        )
+        links = driver.find_elements(*links_locator)
 
         urls = [l.get_attribute("href") for l in links]
         urls = list(dict.fromkeys(urls))  
@@ -44,6 +50,10 @@ def scrap_textes_adoptes(driver):
 
         print(f"TOTAL cumulé : {len(all_urls)}")
 
+        record_page(driver)
+
+        yield urls
+
         try:
             next_btn = driver.find_element(
                 By.XPATH,
@@ -60,15 +70,23 @@ def scrap_textes_adoptes(driver):
             break
 
         print("→ Clic sur Suivant")
+        navigation_started(driver, links[0] if links else next_btn)
         driver.execute_script("arguments[0].click();", next_btn)
+        page_loaded(driver, links_locator)
 
         last_offset = next_href
         page_num += 1
 
-        time.sleep(5)
+        pause(driver, 5)
+
+
+def scrap_textes_adoptes(driver, legislature=CURRENT_LEGISLATURE):
+    all_urls = []
+    for urls in iter_textes_adoptes(driver, legislature):
+        all_urls.extend(urls)
 
     df = pd.DataFrame({
-        "url": all_urls,
+        "url": list(dict.fromkeys(all_urls)),
         "provenance": "textes_adoptes"
     })
 
@@ -3,58 +3,111 @@ warnings.filterwarnings("ignore", category=UserWarning)
 
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
-from scrap_projets_lois import scrap_projets_lois
-from scrap_propositions_lois import scrap_propositions_lois
-from scrap_rapports_legislatifs import scrap_rapports_legislatifs
-from scrap_textes_adoptes import scrap_textes_adoptes
-from scrap_dossiers_legislatifs import scrap_dossiers_legislatifs
+from scrap_projets_lois import iter_projets_lois
+from scrap_propositions_lois import iter_propositions_lois
+from scrap_rapports_legislatifs import iter_rapports_legislatifs
+from scrap_textes_adoptes import iter_textes_adoptes
+from scrap_dossiers_legislatifs import iter_dossiers_legislatifs
+from crawl_profile import make_light_driver, CrawlMetrics
+from legislatures import CURRENT_LEGISLATURE
+import http_cassette
+import listing_cassette
 
+http_cassette.install()
+
+# SCRAPING_FULL_BROWSER=1 : ancien profil Chrome complet (comparaison des mesures)
+FULL_BROWSER = os.getenv("SCRAPING_FULL_BROWSER") == "1"
+
+MAX_PARALLEL_LEGISLATURES = 3
+
+
+def make_driver(profile_name="default", block_css=True):
+    """
+    Navigateur des listings ; au rejeu d'une cassette (HTTP_CASSETTE_MODE=replay),
+    un ReplayDriver sans navigateur.
+    """
+    driver = listing_cassette.listing_driver(lambda: _make_browser(profile_name, block_css))
+    if isinstance(driver, listing_cassette.ReplayDriver):
+        driver.crawl_metrics = CrawlMetrics(driver)
+    return driver
+
+
+def _make_browser(profile_name, block_css):
+    if not FULL_BROWSER:
+        return make_light_driver(profile_name, block_css)
 
-def make_driver():
     options = Options()
     options.add_argument("--start-maximized")
     options.add_argument("--disable-infobars")
     options.add_argument("--disable-notifications")
     options.add_argument("--headless")
-    return webdriver.Chrome(options=options)
+    driver = webdriver.Chrome(options=options)
+    driver.crawl_metrics = CrawlMetrics(driver)
+    return driver
 
 
-def scrap_urls_all():
-    print("\n===== SCRAP PROJETS DE LOI =====")
-    driver = make_driver()
-    df_projets = scrap_projets_lois(driver)
+def quit_driver(driver, label):
+    print(driver.crawl_metrics.summary(label))
     driver.quit()
 
-    print("\n===== SCRAP PROPOSITIONS DE LOI =====")
-    driver = make_driver()
-    df_propositions = scrap_propositions_lois(driver)
-    driver.quit()
 
-    print("\n===== SCRAP RAPPORTS =====")
-    driver = make_driver()
-    df_rapports = scrap_rapports_legislatifs(driver)
-    driver.quit()
+# (titre, provenance, générateur, bloquer le CSS)
+SCRAPERS = [
+    ("PROJETS DE LOI", "projets_lois", iter_projets_lois, True),
+    ("PROPOSITIONS DE LOI", "propositions_lois", iter_propositions_lois, True),
+    ("RAPPORTS", "rapports_legislatifs", iter_rapports_legislatifs, True),
+    ("TEXTES ADOPTÉS", "textes_adoptes", iter_textes_adoptes, True),
+    # Le bouton "suivant" des dossiers est masqué en CSS sur la dernière page.
+    ("DOSSIERS LÉGISLATIFS", "dossiers_legislatifs", iter_dossiers_legislatifs, False),
+]
 
-    print("\n===== SCRAP TEXTES ADOPTÉS =====")
-    driver = make_driver()
-    df_ta = scrap_textes_adoptes(driver)
-    driver.quit()
 
-    print("\n===== SCRAP DOSSIERS LÉGISLATIFS =====")
-    driver = make_driver()
-    df_dossiers = scrap_dossiers_legislatifs(driver)
-    driver.quit()
+def iter_urls_all(legislature=CURRENT_LEGISLATURE):
+    """
+    Produit (provenance, urls) page par page, catégorie après catégorie.
+    """
+    for title, provenance, iter_pages, block_css in SCRAPERS:
+        print(f"\n===== SCRAP {title} (L{legislature}) =====")
+        # Un profil Chrome par législature : plusieurs crawls peuvent tourner en parallèle.
+        driver = make_driver(profile_name=f"l{legislature}", block_css=block_css)
+        try:
+            for urls in iter_pages(driver, legislature):
+                yield provenance, urls
+        finally:
+            quit_driver(driver, f"{provenance} L{legislature}")
+
+
+def scrap_urls_all(legislature=CURRENT_LEGISLATURE):
+    urls_by_provenance = {provenance: {} for _, provenance, _, _ in SCRAPERS}
+    for provenance, urls in iter_urls_all(legislature):
+        urls_by_provenance[provenance].update(dict.fromkeys(urls))
 
     df_final = pd.concat([
-        df_projets,
-        df_propositions,
-        df_rapports,
-        df_ta,
-        df_dossiers
+        pd.DataFrame({"url": list(urls), "provenance": provenance})
+        for provenance, urls in urls_by_provenance.items()
     ], ignore_index=True)
 
     return df_final
+
+
+def scrap_legislatures(legislatures, max_parallel=MAX_PARALLEL_LEGISLATURES):
+    """
+    Crawle plusieurs législatures en parallèle (un navigateur par législature).
+    Retourne {législature: DataFrame} ; une législature en échec est absente.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = {executor.submit(scrap_urls_all, leg): leg for leg in legislatures}
+        for future in as_completed(futures):
+            leg = futures[future]
+            try:
+                results[leg] = future.result().assign(legislature=leg)
+                print(f"\n>>> Législature {leg} : {len(results[leg])} URLs")
+            except Exception as e:
+                print(f"\n>>> ❌ Législature {leg} : {e}")
+    return results
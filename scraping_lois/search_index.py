@@ -0,0 +1,228 @@
+import os
+import io
+import time
+import sqlite3
+import argparse
+import statistics
+
+import polars as pl
+
+from db_store import fetch_db
+from extract_text import storage, load_manifest, corpus_key
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.path.join(BASE_DIR, "db", "search_index.sqlite")
+MERGE_PAGES = 500
+
+# ----------------------------
+#  Index plein texte (SQLite FTS5)
+# ----------------------------
+# documents  : une ligne par PDF, métadonnées jointes depuis db_urls.parquet
+# pages      : (id, pdf_name, page) — id = rowid de pages_fts
+# pages_fts  : texte des pages, tokenizer sans accents ("amende" trouve "amendé")
+#
+# La mise à jour compare content_hash au manifeste du corpus : seuls les
+# documents nouveaux ou modifiés sont (ré)indexés, ceux sortis du manifeste
+# sont retirés. Après une mise à jour, un 'merge' FTS5 borné (MERGE_PAGES)
+# fusionne quelques segments : coût proportionnel au lot, pas au corpus.
+# L'optimisation complète (réécriture de tout l'index) est explicite :
+# `python search_index.py update --optimize`.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    pdf_name TEXT PRIMARY KEY,
+    doc_type TEXT,
+    doc_id TEXT,
+    url TEXT,
+    provenance TEXT,
+    added_at TEXT,
+    content_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    pdf_name TEXT NOT NULL,
+    page INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_pdf_name ON pages(pdf_name);
+CREATE INDEX IF NOT EXISTS documents_provenance ON documents(provenance, added_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    text, tokenize="unicode61 remove_diacritics 2"
+);
+"""
+
+
+def connect(index_path=INDEX_PATH):
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def load_db_metadata(pdf_names):
+    """
+    Métadonnées (url, provenance, added_at) des PDFs donnés, indexées par pdf_name.
+    """
+    df, _ = fetch_db(log=lambda _: None)
+    df = df.filter(pl.col("pdf_name").is_in(list(pdf_names))).select(["pdf_name", "url", "provenance", "added_at"])
+    return {row["pdf_name"]: row for row in df.iter_rows(named=True)}
+
+
+def fetch_corpus_pages(doc_type, doc_id):
+    body, _ = storage.get(corpus_key(doc_type, doc_id))
+    df = pl.read_parquet(io.BytesIO(body))
+    return df.sort("page").select(["page", "text"]).rows()
+
+
+def remove_document(conn, pdf_name):
+    ids = [(row[0],) for row in conn.execute("SELECT id FROM pages WHERE pdf_name = ?", (pdf_name,))]
+    conn.executemany("DELETE FROM pages_fts WHERE rowid = ?", ids)
+    conn.execute("DELETE FROM pages WHERE pdf_name = ?", (pdf_name,))
+    conn.execute("DELETE FROM documents WHERE pdf_name = ?", (pdf_name,))
+
+
+def add_document(conn, doc, meta, pages):
+    conn.execute(
+        "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (doc["pdf_name"], doc["doc_type"], doc["doc_id"],
+         meta.get("url"), meta.get("provenance"), meta.get("added_at"), doc["content_hash"])
+    )
+    for page, text in pages:
+        cur = conn.execute("INSERT INTO pages (pdf_name, page) VALUES (?, ?)", (doc["pdf_name"], page))
+        conn.execute("INSERT INTO pages_fts (rowid, text) VALUES (?, ?)", (cur.lastrowid, text))
+
+# ----------------------------
+#  Mise à jour incrémentale
+# ----------------------------
+def update_index(index_path=INDEX_PATH, optimize=False, log=print):
+    conn = connect(index_path)
+    indexed = dict(conn.execute("SELECT pdf_name, content_hash FROM documents"))
+    manifest = load_manifest()
+
+    changed = [
+        doc for doc in manifest.iter_rows(named=True)
+        if indexed.get(doc["pdf_name"]) != doc["content_hash"]
+    ]
+    removed = set(indexed) - set(manifest["pdf_name"].to_list())
+    log(f"[INDEX] {len(changed)} documents à (ré)indexer, {len(removed)} à retirer, {len(indexed)} déjà indexés")
+
+    start = time.time()
+    if removed:
+        with conn:
+            for pdf_name in removed:
+                remove_document(conn, pdf_name)
+
+    count = 0
+    if changed:
+        metadata = load_db_metadata(doc["pdf_name"] for doc in changed)
+        for doc in changed:
+            try:
+                pages = fetch_corpus_pages(doc["doc_type"], doc["doc_id"])
+            except Exception as e:
+                log(f"[INDEX] ❌ {doc['pdf_name']} : {e}")
+                continue
+            with conn:
+                remove_document(conn, doc["pdf_name"])
+                add_document(conn, doc, metadata.get(doc["pdf_name"], {}), pages)
+            count += 1
+
+    with conn:
+        if optimize:
+            conn.execute("INSERT INTO pages_fts(pages_fts) VALUES ('optimize')")
+        elif count or removed:
+            conn.execute("INSERT INTO pages_fts(pages_fts, rank) VALUES ('merge', ?)", (MERGE_PAGES,))
+    conn.close()
+    log(f"[INDEX] ✅ {count} documents indexés, {len(removed)} retirés en {time.time() - start:.1f}s")
+    return count
+
+# ----------------------------
+#  Recherche
+# ----------------------------
+def search(query, limit=20, provenance=None, added_since=None, index_path=INDEX_PATH, conn=None):
+    """
+    Recherche FTS5 (syntaxe MATCH : "mots exacts", OR, NEAR, préfixe*).
+    Retourne une liste de dicts triés par pertinence (bm25).
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect(index_path)
+
+    sql = """
+        SELECT d.pdf_name, d.doc_type, d.doc_id, d.url, d.provenance, d.added_at, p.page,
+               snippet(pages_fts, 0, '[', ']', '…', 12) AS extrait,
+               bm25(pages_fts) AS score
+        FROM pages_fts
+        JOIN pages p ON p.id = pages_fts.rowid
+        JOIN documents d ON d.pdf_name = p.pdf_name
+        WHERE pages_fts MATCH ?
+    """
+    params = [query]
+    if provenance:
+        sql += " AND d.provenance = ?"
+        params.append(provenance)
+    if added_since:
+        sql += " AND d.added_at >= ?"
+        params.append(added_since)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+
+    cursor = conn.execute(sql, params)
+    columns = [c[0] for c in cursor.description]
+    results = [dict(zip(columns, row)) for row in cursor]
+    if own_conn:
+        conn.close()
+    return results
+
+
+def benchmark(queries, repeat=20, index_path=INDEX_PATH):
+    """
+    Latence des requêtes (connexion réutilisée, comme dans une API).
+    """
+    conn = connect(index_path)
+    n_pages = conn.execute("SELECT count(*) FROM pages").fetchone()[0]
+    print(f"Index : {n_pages} pages")
+    for query in queries:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            search(query, conn=conn)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"   {query!r:40} p50={statistics.median(timings):.2f}ms p95={p95:.2f}ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index plein texte du corpus législatif.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    u = sub.add_parser("update", help="Indexe les documents nouveaux ou modifiés")
+    u.add_argument("--optimize", action="store_true", help="Réécrit tout l'index FTS5 (lent, à lancer ponctuellement)")
+
+    q = sub.add_parser("query", help="Recherche dans l'index")
+    q.add_argument("query")
+    q.add_argument("--limit", type=int, default=20)
+    q.add_argument("--provenance", default=None)
+    q.add_argument("--since", default=None, help="added_at minimum (AAAA-MM-JJ)")
+
+    b = sub.add_parser("bench", help="Mesure la latence des requêtes")
+    b.add_argument("queries", nargs="*", default=["loi", "énergie", "\"fonction publique\"", "santé NEAR(hôpital, 5)", "climat*"])
+    b.add_argument("--repeat", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "update":
+        update_index(optimize=args.optimize)
+    elif args.command == "query":
+        try:
+            results = search(args.query, args.limit, args.provenance, args.since)
+        except sqlite3.OperationalError as e:
+            # Syntaxe MATCH invalide (guillemet non fermé, opérateur seul…)
+            parser.error(f"requête invalide : {e}")
+        for r in results:
+            print(f"{r['score']:.2f}  {r['pdf_name']} p.{r['page']}  ({r['provenance']}, {r['added_at']})")
+            print(f"       {r['extrait']}")
+            print(f"       {r['url']}")
+    else:
+        benchmark(args.queries, args.repeat)
@@ -0,0 +1,395 @@
+import os
+import io
+import sys
+import json
+import time
+import zlib
+import socket
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+
+import polars as pl
+
+from db_store import storage, fetch_db, commit_db, DB_FILENAME
+from storage import PreconditionFailed
+from db_updates import apply_download_results
+from download_pdfs import process_row, log_resolver_stats
+from doc_identity import extract_id, extract_legislature, pdf_filename
+from results_buffer import RESULT_SCHEMA
+
+# ----------------------------
+#  Exécution shardée (backfills)
+# ----------------------------
+# plan  : sélectionne les lignes à traiter dans la DB et les répartit en N
+#         shards de façon déterministe (crc32 de doc_type:doc_id, sinon url).
+# work  : chaque worker prend un bail (lease) sur un shard libre ou expiré via
+#         des écritures conditionnelles (If-None-Match / If-Match), le renouvelle
+#         en tâche de fond et écrit ses résultats par paquets (deltas). Un shard
+#         repris après un crash saute les URLs déjà présentes dans les deltas.
+#         Le bail n'est jamais supprimé : il est rendu par une écriture
+#         conditionnelle (If-Match) qui le marque expiré, et le shard n'est
+#         marqué terminé qu'après un renouvellement conditionnel réussi. Un
+#         worker qui a perdu son bail sans le savoir ne touche donc ni au bail
+#         du nouveau propriétaire ni au marqueur done/.
+# merge : fusionne tous les deltas dans db_urls.parquet.
+#
+# Test local, sans bucket : STORAGE_BACKEND=local (voir storage.py), puis
+#   python shard_runner.py plan  --run-id test --shards 8
+#   python shard_runner.py local --run-id test --workers 3 --simulate
+#   python shard_runner.py merge --run-id test
+
+SHARDS_PREFIX = "shards/"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PDF_DIR = os.path.join(BASE_DIR, "db", "pdf")
+
+LEASE_TTL = 600           # secondes sans renouvellement avant reprise possible
+HEARTBEAT_EVERY = LEASE_TTL / 3
+DELTA_CHUNK = 200         # lignes par delta uploadé
+
+
+def log(message: str):
+    line = f"{datetime.now().isoformat()} — {message}"
+    print(line, flush=True)
+    return line
+
+
+def run_key(run_id, name):
+    return f"{SHARDS_PREFIX}{run_id}/{name}"
+
+
+def _exists(key):
+    return storage.head(key) is not None
+
+
+def _read_parquet_key(key):
+    body, _ = storage.get(key)
+    return pl.read_parquet(io.BytesIO(body))
+
+
+def _write_parquet_key(df, key):
+    buf = io.BytesIO()
+    df.write_parquet(buf)
+    storage.put(key, buf.getvalue())
+
+
+def _list_keys(prefix):
+    for obj in storage.list(prefix):
+        yield obj["key"]
+
+
+def _load_db():
+    df, _ = fetch_db(log)
+    return df
+
+# ----------------------------
+#  Planification
+# ----------------------------
+def shard_of(key, n_shards):
+    return zlib.crc32(key.encode("utf-8")) % n_shards
+
+
+def shard_key_expr():
+    return pl.coalesce(
+        pl.concat_str([pl.col("doc_type"), pl.lit(":"), pl.col("doc_id")]),
+        pl.col("url")
+    )
+
+
+def plan_shards(run_id, n_shards, redownload_all=False):
+    db = _load_db()
+    if redownload_all:
+        rows = db.filter(pl.col("is_404") == False)
+    else:
+        rows = db.filter(
+            (pl.col("is_404") == False) &
+            ((pl.col("downloaded") == False) | (pl.col("is_corrupted") == True))
+        )
+
+    rows = rows.select(["url", "provenance", shard_key_expr().alias("shard_key")]).with_columns(
+        pl.col("shard_key")
+          .map_elements(lambda k: shard_of(k, n_shards), return_dtype=pl.Int32)
+          .alias("shard")
+    )
+
+    sizes = {}
+    for shard in range(n_shards):
+        part = rows.filter(pl.col("shard") == shard).select(["url", "provenance"])
+        _write_parquet_key(part, run_key(run_id, f"plan/shard-{shard:04d}.parquet"))
+        sizes[shard] = part.height
+
+    meta = {"n_shards": n_shards, "created_at": datetime.now().isoformat(), "rows": sizes}
+    storage.put(run_key(run_id, "plan.json"), json.dumps(meta).encode())
+    log(f"[PLAN] {rows.height} lignes réparties en {n_shards} shards : {sizes}")
+    return meta
+
+
+def load_plan_meta(run_id):
+    body, _ = storage.get(run_key(run_id, "plan.json"))
+    return json.loads(body)
+
+# ----------------------------
+#  Baux (leases)
+# ----------------------------
+class Lease:
+    def __init__(self, run_id, shard, owner):
+        self.key = run_key(run_id, f"leases/shard-{shard:04d}.json")
+        self.owner = owner
+        self.etag = None
+        self.renewed_at = None
+        self.lost = threading.Event()
+        self._renew_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _body(self):
+        return json.dumps({"owner": self.owner, "expires_at": time.time() + LEASE_TTL}).encode()
+
+    def acquire(self):
+        """
+        Prend le bail s'il est libre ou expiré. Retourne True en cas de succès.
+        """
+        try:
+            self.etag = storage.put(self.key, self._body(), if_none_match=True)
+            self.renewed_at = time.time()
+            return True
+        except PreconditionFailed:
+            pass
+
+        body, etag = storage.get(self.key)
+        current = json.loads(body)
+        if current["expires_at"] > time.time():
+            return False
+        try:
+            self.etag = storage.put(self.key, self._body(), if_match=etag)
+            self.renewed_at = time.time()
+            if current["owner"] is not None:
+                log(f"[LEASE] Reprise du bail expiré de {current['owner']} ({self.key})")
+            return True
+        except PreconditionFailed:
+            return False
+
+    def renew(self):
+        """
+        Renouvellement conditionnel. Retourne False (et marque le bail perdu)
+        si un autre worker l'a repris entre-temps.
+        """
+        with self._renew_lock:
+            if self.lost.is_set():
+                return False
+            try:
+                self.etag = storage.put(self.key, self._body(), if_match=self.etag)
+                self.renewed_at = time.time()
+                return True
+            except PreconditionFailed:
+                log(f"[LEASE] ❌ Bail perdu : {self.key}")
+                self.lost.set()
+                return False
+
+    def _heartbeat(self):
+        while not self._stop.wait(HEARTBEAT_EVERY):
+            try:
+                if not self.renew():
+                    return
+            except Exception as e:
+                if time.time() - self.renewed_at >= LEASE_TTL:
+                    # Plus de renouvellement depuis LEASE_TTL : le bail a pu être repris.
+                    log(f"[LEASE] ❌ Bail expiré sans renouvellement ({e}) : {self.key}")
+                    self.lost.set()
+                    return
+                log(f"[LEASE] ⚠️ Renouvellement échoué ({e}), nouvel essai au prochain battement")
+
+    def start_heartbeat(self):
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
+
+    def release(self):
+        """
+        Rend le bail en le marquant expiré, seulement s'il est toujours à nous
+        (If-Match) : une suppression effacerait le bail d'un repreneur.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self.lost.is_set():
+            return
+        body = json.dumps({"owner": None, "expires_at": 0}).encode()
+        try:
+            storage.put(self.key, body, if_match=self.etag)
+        except PreconditionFailed:
+            log(f"[LEASE] Bail déjà repris par un autre worker : {self.key}")
+        except Exception as e:
+            log(f"[LEASE] ⚠️ Libération échouée ({e}), le bail expirera seul")
+
+# ----------------------------
+#  Worker
+# ----------------------------
+def _simulated_process_row(row, pdf_dir, log):
+    time.sleep(0.01)
+    doc_type, doc_id = extract_id(row["url"])
+    if not doc_id:
+        return {"url": row["url"], "status": "no_id", "filename": None}
+    filename = pdf_filename(doc_type, doc_id, extract_legislature(row["url"]))
+    return {"url": row["url"], "status": "success", "filename": filename}
+
+
+def process_shard(run_id, shard, lease, owner, simulate=False):
+    rows = _read_parquet_key(run_key(run_id, f"plan/shard-{shard:04d}.parquet"))
+    delta_prefix = run_key(run_id, f"deltas/shard-{shard:04d}/")
+
+    done_urls = set()
+    for key in _list_keys(delta_prefix):
+        done_urls.update(_read_parquet_key(key)["url"].to_list())
+    todo = rows.filter(~pl.col("url").is_in(done_urls))
+    log(f"[SHARD {shard}] {todo.height} lignes à traiter ({len(done_urls)} déjà faites)")
+
+    handler = _simulated_process_row if simulate else process_row
+    chunk, part = [], 0
+
+    def upload_chunk():
+        nonlocal chunk, part
+        if chunk:
+            key = f"{delta_prefix}part-{owner}-{part:05d}.parquet"
+            _write_parquet_key(pl.DataFrame(chunk, schema=RESULT_SCHEMA), key)
+            part += 1
+            chunk = []
+
+    for row in todo.iter_rows(named=True):
+        if lease.lost.is_set():
+            upload_chunk()
+            return False
+        try:
+            chunk.append(handler(row, PDF_DIR, log))
+        except Exception as e:
+            log(f"[ERREUR] {row['url']} : {e}")
+            chunk.append({"url": row["url"], "status": "error", "filename": None})
+        if len(chunk) >= DELTA_CHUNK:
+            upload_chunk()
+    upload_chunk()
+    return True
+
+
+def run_worker(run_id, worker_id=0, simulate=False):
+    os.makedirs(PDF_DIR, exist_ok=True)
+    n_shards = load_plan_meta(run_id)["n_shards"]
+    owner = f"{socket.gethostname()}-{os.getpid()}-{worker_id}"
+    completed = 0
+
+    # Chaque worker commence à un shard différent pour limiter les collisions.
+    order = [(worker_id + i) % n_shards for i in range(n_shards)]
+    for shard in order:
+        done_key = run_key(run_id, f"done/shard-{shard:04d}")
+        if _exists(done_key):
+            continue
+        lease = Lease(run_id, shard, owner)
+        if not lease.acquire():
+            continue
+        # Un autre worker a pu terminer entre notre test et la prise du bail.
+        if _exists(done_key):
+            lease.release()
+            continue
+
+        log(f"[WORKER {owner}] Shard {shard} acquis")
+        lease.start_heartbeat()
+        try:
+            finished = process_shard(run_id, shard, lease, owner, simulate)
+            # Renouvellement conditionnel juste avant done/ : on possède encore le
+            # bail, et personne ne peut le reprendre avant LEASE_TTL.
+            if finished and lease.renew():
+                storage.put(done_key, owner.encode())
+                completed += 1
+                log(f"[WORKER {owner}] ✅ Shard {shard} terminé")
+        finally:
+            lease.release()
+
+    if not simulate:
+        log_resolver_stats(log)
+    log(f"[WORKER {owner}] Fin : {completed} shards traités")
+    return completed
+
+# ----------------------------
+#  Fusion
+# ----------------------------
+def shard_status(run_id):
+    n_shards = load_plan_meta(run_id)["n_shards"]
+    done = {int(k.rsplit("-", 1)[1]) for k in _list_keys(run_key(run_id, "done/"))}
+    now = time.time()
+    leased = set()
+    for key in _list_keys(run_key(run_id, "leases/")):
+        # Les baux rendus restent en place, marqués expirés.
+        if json.loads(storage.get(key)[0])["expires_at"] > now:
+            leased.add(int(key.rsplit("-", 1)[1].split(".")[0]))
+    return n_shards, done, leased
+
+
+def merge_run(run_id, allow_partial=False):
+    n_shards, done, _ = shard_status(run_id)
+    missing = sorted(set(range(n_shards)) - done)
+    if missing and not allow_partial:
+        raise RuntimeError(f"Shards non terminés : {missing} (utiliser --allow-partial)")
+
+    parts = [_read_parquet_key(k) for k in _list_keys(run_key(run_id, "deltas/"))]
+    if not parts:
+        log("[MERGE] Aucun delta à fusionner.")
+        return 0
+    results = pl.concat(parts).unique(subset="url", keep="last")
+
+    commit_db(lambda db: apply_download_results(db, results.lazy()), log)
+
+    counts = dict(results.group_by("status").len().iter_rows())
+    log(f"[MERGE] ✅ {results.height} résultats fusionnés dans {DB_FILENAME} : {counts}")
+    return results.height
+
+
+def run_local(run_id, workers, simulate=False):
+    """
+    Lance `workers` processus worker sur la même run (test local multi-processus).
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), "work", "--run-id", run_id]
+    if simulate:
+        cmd.append("--simulate")
+    procs = [subprocess.Popen(cmd + ["--worker-id", str(i)]) for i in range(workers)]
+    codes = [p.wait() for p in procs]
+    n_shards, done, leased = shard_status(run_id)
+    log(f"[LOCAL] Codes retour : {codes} — {len(done)}/{n_shards} shards terminés, {len(leased)} baux actifs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exécution shardée des téléchargements.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("plan")
+    p.add_argument("--run-id", required=True)
+    p.add_argument("--shards", type=int, required=True)
+    p.add_argument("--all", action="store_true", help="Re-télécharger tout le corpus (hors 404)")
+
+    w = sub.add_parser("work")
+    w.add_argument("--run-id", required=True)
+    w.add_argument("--worker-id", type=int, default=0)
+    w.add_argument("--simulate", action="store_true", help="Pas de réseau ni d'upload PDF (tests)")
+
+    m = sub.add_parser("merge")
+    m.add_argument("--run-id", required=True)
+    m.add_argument("--allow-partial", action="store_true")
+
+    st = sub.add_parser("status")
+    st.add_argument("--run-id", required=True)
+
+    lo = sub.add_parser("local")
+    lo.add_argument("--run-id", required=True)
+    lo.add_argument("--workers", type=int, default=2)
+    lo.add_argument("--simulate", action="store_true")
+
+    args = parser.parse_args()
+    if args.command == "plan":
+        plan_shards(args.run_id, args.shards, args.all)
+    elif args.command == "work":
+        run_worker(args.run_id, args.worker_id, args.simulate)
+    elif args.command == "merge":
+        merge_run(args.run_id, args.allow_partial)
+    elif args.command == "status":
+        n, done, leased = shard_status(args.run_id)
+        print(f"{len(done)}/{n} shards terminés, baux actifs : {sorted(leased)}")
+    else:
+        run_local(args.run_id, args.workers, args.simulate)
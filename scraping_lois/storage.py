@@ -0,0 +1,401 @@
+import os
+import time
+import fcntl
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+
+from dotenv import load_dotenv
+
+# ----------------------------
+#  Stockage objet (S3/R2 ou système de fichiers local)
+# ----------------------------
+# Une seule interface pour tout le pipeline : get / stream / head / put
+# (conditionnel) / upload_file / download_file / copy / list / delete /
+# delete_many. Deux implémentations :
+#  - S3Storage    : un client boto3 partagé (pool de connexions, retries
+#                   adaptatifs) et des réglages de transfert multipart communs
+#  - LocalStorage : un dossier local, mêmes sémantiques (ETag, If-Match,
+#                   If-None-Match) pour faire tourner et mesurer le pipeline
+#                   hors ligne
+# Choix : STORAGE_BACKEND=s3 (défaut) | local, LOCAL_STORAGE_DIR pour le dossier.
+
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+LOCAL_STORAGE_DIR = os.getenv(
+    "LOCAL_STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "bucket")
+)
+
+MAX_POOL_CONNECTIONS = 32
+MB = 1024 * 1024
+MULTIPART_THRESHOLD = 16 * MB
+MULTIPART_CHUNKSIZE = 16 * MB
+TRANSFER_CONCURRENCY = 8
+STREAM_CHUNK_SIZE = 1 * MB
+DELETE_BATCH_SIZE = 1000  # limite de l'API delete_objects
+
+MISSING_CODES = ("NoSuchKey", "404", "NotFound")
+PRECONDITION_CODES = ("PreconditionFailed", "ConditionalRequestConflict", "412")
+
+
+class ObjectNotFound(KeyError):
+    pass
+
+
+class PreconditionFailed(Exception):
+    pass
+
+
+class S3Storage:
+    def __init__(self, bucket=None):
+        import boto3
+        from botocore.config import Config
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket or os.getenv("BUCKET_NAME")
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=os.getenv("R2_ENDPOINT_URL"),
+            aws_access_key_id=os.getenv("R2_ACCESS_KEY_ID"),
+            aws_secret_access_key=os.getenv("R2_SECRET_ACCESS_KEY"),
+            # Vérification TLS active sauf R2_VERIFY_SSL=0 (ancien verify=False de verif_pdfs_db.py)
+            verify=os.getenv("R2_VERIFY_SSL", "1") != "0",
+            config=Config(
+                max_pool_connections=MAX_POOL_CONNECTIONS,
+                retries={"max_attempts": 5, "mode": "adaptive"},
+                tcp_keepalive=True,
+            ),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=TRANSFER_CONCURRENCY,
+            use_threads=True,
+        )
+
+    def _translate(self, e, key):
+        from botocore.exceptions import ClientError
+        if isinstance(e, ClientError):
+            code = e.response.get("Error", {}).get("Code")
+            if code in MISSING_CODES:
+                return ObjectNotFound(key)
+            if code in PRECONDITION_CODES:
+                return PreconditionFailed(key)
+        return e
+
+    def stream(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Retourne (etag, itérateur de morceaux).
+        """
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            raise self._translate(e, key) from e
+        return obj["ETag"], obj["Body"].iter_chunks(chunk_size)
+
+    def get(self, key):
+        """
+        Retourne (contenu, etag).
+        """
+        etag, chunks = self.stream(key)
+        return b"".join(chunks), etag
+
+    def head(self, key):
+        """
+        {"size", "etag"} ou None si l'objet n'existe pas.
+        """
+        try:
+            obj = self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            error = self._translate(e, key)
+            if isinstance(error, ObjectNotFound):
+                return None
+            raise error from e
+        return {"size": obj["ContentLength"], "etag": obj["ETag"]}
+
+    def put(self, key, body, if_match=None, if_none_match=False):
+        """
+        Écrit l'objet et retourne son ETag. Lève PreconditionFailed si la
+        condition (If-Match etag / If-None-Match *) n'est pas remplie.
+        """
+        condition = {}
+        if if_match:
+            condition["IfMatch"] = if_match
+        elif if_none_match:
+            condition["IfNoneMatch"] = "*"
+        try:
+            return self.client.put_object(Bucket=self.bucket, Key=key, Body=body, **condition)["ETag"]
+        except Exception as e:
+            raise self._translate(e, key) from e
+
+    def upload_file(self, path, key):
+        self.client.upload_file(path, self.bucket, key, Config=self.transfer_config)
+
+    def download_file(self, key, path):
+        try:
+            self.client.download_file(self.bucket, key, path, Config=self.transfer_config)
+        except Exception as e:
+            raise self._translate(e, key) from e
+
+    def copy(self, src_key, dst_key):
+        """
+        Copie côté serveur (multipart au-delà de MULTIPART_THRESHOLD).
+        """
+        try:
+            self.client.copy({"Bucket": self.bucket, "Key": src_key}, self.bucket, dst_key, Config=self.transfer_config)
+        except Exception as e:
+            raise self._translate(e, src_key) from e
+
+    def list(self, prefix=""):
+        """
+        Itère sur {"key", "size", "etag"} des objets sous `prefix`.
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield {"key": obj["Key"], "size": obj["Size"], "etag": obj["ETag"]}
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_many(self, keys):
+        """
+        Supprime par lots de 1000. Retourne les clés en erreur.
+        """
+        failed = []
+        for i in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[i:i + DELETE_BATCH_SIZE]
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True}
+            )
+            failed.extend(err["Key"] for err in response.get("Errors", []))
+        return failed
+
+
+class _LocalObject(dict):
+    """
+    Entrée de LocalStorage.list : l'ETag n'est calculé qu'à la lecture, pour
+    que lister des clés ne coûte pas un MD5 par fichier.
+    """
+
+    def __init__(self, storage, path, **fields):
+        super().__init__(**fields)
+        self._storage = storage
+        self._path = path
+
+    def __missing__(self, name):
+        if name != "etag":
+            raise KeyError(name)
+        self["etag"] = self._storage._etag_of_file(self._path)
+        return self["etag"]
+
+    def get(self, name, default=None):
+        return self[name] if name == "etag" or name in self else default
+
+
+class LocalStorage:
+    """
+    Même interface que S3Storage sur un dossier local. ETag = MD5 du contenu
+    (entre guillemets, comme S3), mis en cache par (mtime, taille) ; les
+    écritures conditionnelles sont sérialisées par un verrou de fichier,
+    valable entre processus.
+    """
+
+    def __init__(self, root=LOCAL_STORAGE_DIR):
+        self.root = os.path.abspath(root)
+        self.bucket = self.root
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._etags = {}
+        self._etags_lock = threading.Lock()
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Clé hors du stockage : {key}")
+        return path
+
+    def _etag_of_file(self, path):
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._etags_lock:
+            cached = self._etags.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+                md5.update(chunk)
+        etag = f'"{md5.hexdigest()}"'
+        with self._etags_lock:
+            self._etags[path] = (signature, etag)
+        return etag
+
+    def _remember_etag(self, path, etag):
+        st = os.stat(path)
+        with self._etags_lock:
+            self._etags[path] = ((st.st_mtime_ns, st.st_size), etag)
+
+    def stream(self, key, chunk_size=STREAM_CHUNK_SIZE):
+        path = self._path(key)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            raise ObjectNotFound(key) from None
+        etag = self._etag_of_file(path)
+
+        def chunks():
+            with f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    yield chunk
+        return etag, chunks()
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            raise ObjectNotFound(key) from None
+        return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+    def head(self, key):
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        return {"size": os.path.getsize(path), "etag": self._etag_of_file(path)}
+
+    def _write_atomic(self, path, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put(self, key, body, if_match=None, if_none_match=False):
+        path = self._path(key)
+        with self._lock, open(os.path.join(self.root, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if if_match or if_none_match:
+                current = self._etag_of_file(path) if os.path.isfile(path) else None
+                if (if_none_match and current is not None) or (if_match and current != if_match):
+                    raise PreconditionFailed(key)
+            self._write_atomic(path, lambda f: f.write(body))
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            self._remember_etag(path, etag)
+        return etag
+
+    def upload_file(self, path, key):
+        def copy(dst):
+            with open(path, "rb") as src:
+                shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+        self._write_atomic(self._path(key), copy)
+
+    def download_file(self, key, path):
+        src = self._path(key)
+        if not os.path.isfile(src):
+            raise ObjectNotFound(key)
+        shutil.copyfile(src, path)
+
+    def copy(self, src_key, dst_key):
+        src = self._path(src_key)
+        if not os.path.isfile(src):
+            raise ObjectNotFound(src_key)
+
+        def copy(dst):
+            with open(src, "rb") as f:
+                shutil.copyfileobj(f, dst, STREAM_CHUNK_SIZE)
+        self._write_atomic(self._path(dst_key), copy)
+
+    def list(self, prefix=""):
+        # On ne parcourt que le dossier contenant le préfixe.
+        start = os.path.join(self.root, *prefix.split("/")[:-1])
+        for dirpath, dirnames, filenames in os.walk(start):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename == ".lock" or filename.endswith(".part"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    yield _LocalObject(self, path, key=key, size=os.path.getsize(path))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+        return []
+
+
+BACKENDS = {"s3": S3Storage, "local": LocalStorage}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """
+    Instance partagée par tout le processus (un seul pool de connexions).
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND not in BACKENDS:
+                raise ValueError(f"STORAGE_BACKEND inconnu : {STORAGE_BACKEND} (attendu : {', '.join(BACKENDS)})")
+            _storage = BACKENDS[STORAGE_BACKEND]()
+        return _storage
+
+# ----------------------------
+#  Benchmark
+# ----------------------------
+def benchmark(storage, n_objects=200, size=256 * 1024, workers=8, prefix="_bench/"):
+    from concurrent.futures import ThreadPoolExecutor
+
+    payload = os.urandom(size)
+    keys = [f"{prefix}obj-{i:05d}" for i in range(n_objects)]
+    total_mb = n_objects * size / MB
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        start = time.time()
+        list(pool.map(lambda k: storage.put(k, payload), keys))
+        put_s = time.time() - start
+
+        start = time.time()
+        list(pool.map(storage.get, keys))
+        get_s = time.time() - start
+
+        start = time.time()
+        listed = sum(1 for _ in storage.list(prefix))
+        list_s = time.time() - start
+
+        list(pool.map(storage.delete, keys))
+
+    print(f"{type(storage).__name__} : {n_objects} objets de {size // 1024} Ko, {workers} threads")
+    print(f"   put  : {put_s:.2f}s ({total_mb / put_s:.1f} Mo/s)")
+    print(f"   get  : {get_s:.2f}s ({total_mb / get_s:.1f} Mo/s)")
+    print(f"   list : {list_s:.2f}s ({listed} objets)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du stockage objet.")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=STORAGE_BACKEND)
+    parser.add_argument("--objects", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    benchmark(BACKENDS[args.backend](), args.objects, args.size_kb * 1024, args.workers)
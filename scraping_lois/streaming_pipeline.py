@@ -0,0 +1,105 @@
+import time
+import queue
+import threading
+
+import polars as pl
+
+from scrap_urls_all import iter_urls_all
+from url_canonical import canonical_url, doc_key
+from download_pdfs import process_row, log_resolver_stats
+from results_buffer import ResultsBuffer
+
+# ----------------------------
+#  Mode streaming : crawl et téléchargements en parallèle
+# ----------------------------
+# Le crawler (producteur) pousse les URLs inconnues de la DB page par page
+# dans une file bornée ; des workers (consommateurs) les téléchargent pendant
+# que le crawl continue. La durée totale tend vers max(crawl, download) au lieu
+# de la somme. La file bornée freine le crawler si les téléchargements
+# prennent du retard.
+
+QUEUE_SIZE = 500
+DOWNLOAD_WORKERS = 8
+
+_DONE = object()
+
+
+def crawl_and_download(known_keys, seed_rows, pdf_dir, log, workers=DOWNLOAD_WORKERS):
+    """
+    `known_keys` : clés des documents déjà en DB (jamais remis en file, voir
+                   url_canonical.py).
+    `seed_rows`  : lignes connues à (re)traiter d'emblée (corrompus, à réessayer).
+
+    Retourne (new_df, download_results) : new_df a le même format que
+    scrap_urls_all() (url, provenance) et contient toutes les URLs scrapées
+    brutes (à passer à canonical_frame) ; les URLs mises en file sont canoniques ;
+    download_results est un ResultsBuffer.
+    """
+    work = queue.Queue(maxsize=QUEUE_SIZE)
+    results = ResultsBuffer()
+    scraped = {}
+    seen_keys = set()
+    crawl_errors = []
+    timings = {}
+
+    def producer():
+        start = time.time()
+        try:
+            for row in seed_rows:
+                work.put(row)
+            for provenance, urls in iter_urls_all():
+                queued = 0
+                for url in urls:
+                    if not url or url in scraped:
+                        continue
+                    scraped[url] = provenance
+                    canonical = canonical_url(url)
+                    key = doc_key(canonical)
+                    if key in seen_keys:
+                        continue
+                    seen_keys.add(key)
+                    if key not in known_keys:
+                        work.put({"url": canonical, "provenance": provenance})
+                        queued += 1
+                if queued:
+                    log(f"[STREAM] +{queued} URLs en file ({provenance}), file ≈ {work.qsize()}")
+        except Exception as e:
+            crawl_errors.append(e)
+            log(f"[STREAM] ❌ Crawl interrompu : {e}")
+        finally:
+            timings["crawl"] = time.time() - start
+            for _ in range(workers):
+                work.put(_DONE)
+
+    def consumer():
+        while True:
+            row = work.get()
+            if row is _DONE:
+                return
+            try:
+                result = process_row(row, pdf_dir, log)
+            except Exception as e:
+                log(f"[ERREUR] {row['url']} : {e}")
+                result = {"url": row["url"], "status": "error", "filename": None}
+            results.append(result)
+
+    start = time.time()
+    threads = [threading.Thread(target=producer, name="crawler")]
+    threads += [threading.Thread(target=consumer, name=f"download-{i}") for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.time() - start
+
+    log_resolver_stats(log)
+    log(f"[STREAM] Crawl {timings.get('crawl', 0):.0f}s, total {wall:.0f}s "
+        f"({len(scraped)} URLs scrapées, {len(results)} traitées, {workers} workers)")
+    if crawl_errors:
+        log("[STREAM] ⚠️ Crawl incomplet : seules les URLs déjà scrapées seront ajoutées à la DB.")
+
+    new_df = pl.DataFrame(
+        {"url": list(scraped.keys()), "provenance": list(scraped.values())},
+        schema={"url": pl.String, "provenance": pl.String}
+    )
+    return new_df, results
@@ -0,0 +1,208 @@
+import io
+import re
+import argparse
+from datetime import date
+
+import polars as pl
+
+from doc_identity import extract_id, extract_legislature, doc_identity_exprs
+from db_store import storage, fetch_db
+from storage import ObjectNotFound
+
+# ----------------------------
+#  URLs canoniques & clés de document
+# ----------------------------
+# Un même document apparaît sous plusieurs URLs : hôtes www / www2, chemins
+# /dyn/old/17/, /dyn/17/ ou /17/, query strings et fragments. On ramène chaque
+# URL scrapée à une forme canonique, puis à une clé de document sur laquelle
+# se fait la comparaison avec la DB. Propositions, projets, rapports et textes
+# de la page dossier (/dyn/17/textes/l17bNNNN_…) partagent la numérotation
+# des dépôts (série B) : leur clé est depot:législature:numéro, si bien que
+# pion0123.asp et l17b0123_proposition-loi donnent le même document. Les
+# textes adoptés (série T) gardent texte_adopte:législature:numéro.
+# Chaque URL observée est gardée dans url_aliases.parquet (alias → canonique).
+#
+# Deux chemins, comme doc_identity.py : canonical_url(url) ligne à ligne
+# (crawl en flux) et canonical_url_expr() en masse ; les règles sont partagées.
+
+SITE_URL = "https://www.assemblee-nationale.fr"
+ALIAS_FILENAME = "url_aliases.parquet"
+
+ALIAS_SCHEMA = {
+    "alias_url": pl.String,
+    "canonical_url": pl.String,
+    "doc_key": pl.String,
+    "first_seen": pl.String,
+}
+
+# (motif, remplacement Polars, remplacement Python) — appliqués dans l'ordre.
+CANONICAL_RULES = [
+    (r"[?#].*$", "", ""),
+    (r"(?i)^https?://(?:www2?\.)?assemblee-nationale\.fr", SITE_URL, SITE_URL),
+    (
+        r"^https://www\.assemblee-nationale\.fr/(?:dyn/)?(\d+)/(propositions|projets|rapports|ta)/",
+        SITE_URL + "/dyn/old/${1}/${2}/",
+        SITE_URL + r"/dyn/old/\g<1>/\g<2>/",
+    ),
+]
+_COMPILED_RULES = [(re.compile(pattern), repl) for pattern, _, repl in CANONICAL_RULES]
+
+# Types numérotés dans la série des dépôts (B) d'une législature.
+DEPOT_TYPES = ("proposition_loi", "projet_loi", "rapport_legislatif", "dossier_legislatif")
+_LEADING_ZEROS = re.compile(r"^0+(?=\d)")
+
+
+def canonical_url(url):
+    url = url.strip()
+    for pattern, repl in _COMPILED_RULES:
+        url = pattern.sub(repl, url, count=1)
+    return url
+
+
+def canonical_url_expr(col="url"):
+    url = pl.col(col).str.strip_chars()
+    for pattern, repl, _ in CANONICAL_RULES:
+        url = url.str.replace(pattern, repl)
+    return url
+
+
+def doc_key(url):
+    """
+    Clé de document d'une URL canonique ; l'URL elle-même si le type est inconnu.
+    """
+    doc_type, doc_id = extract_id(url)
+    if doc_type == "inconnu" or not doc_id:
+        return url
+    legislature = extract_legislature(url)
+    family = "depot" if doc_type in DEPOT_TYPES else doc_type
+    number = _LEADING_ZEROS.sub("", doc_id.lower())
+    return f"{family}:{legislature if legislature is not None else '?'}:{number}"
+
+
+def doc_key_expr(col="url"):
+    doc_type, doc_id, legislature, _ = doc_identity_exprs(col)
+    known = (doc_type != "inconnu") & doc_id.is_not_null()
+    family = pl.when(doc_type.is_in(list(DEPOT_TYPES))).then(pl.lit("depot")).otherwise(doc_type)
+    return (
+        pl.when(known)
+          .then(pl.concat_str([
+              family,
+              legislature.cast(pl.String).fill_null("?"),
+              doc_id.str.to_lowercase().str.replace(r"^0+(\d)", "${1}"),
+          ], separator=":"))
+          .otherwise(pl.col(col))
+          .alias("doc_key")
+    )
+
+
+def canonical_frame(raw_df):
+    """
+    (url, provenance) scrapés bruts → (documents dédoublonnés par doc_key avec
+    URL canonique, table d'alias de toutes les URLs observées).
+    """
+    df = (
+        raw_df.select(pl.col("url").alias("alias_url"), "provenance")
+              .filter(pl.col("alias_url").is_not_null())
+              .with_columns(canonical_url_expr("alias_url").alias("url"))
+              .with_columns(doc_key_expr("url"))
+    )
+    docs = df.unique(subset="doc_key", keep="first", maintain_order=True).select(["url", "provenance", "doc_key"])
+    aliases = (
+        df.unique(subset="alias_url", keep="first", maintain_order=True)
+          .select(
+              "alias_url",
+              pl.col("url").alias("canonical_url"),
+              "doc_key",
+              pl.lit(date.today().isoformat()).alias("first_seen"),
+          )
+    )
+    return docs, aliases
+
+
+def with_doc_key(db_df):
+    """
+    Ajoute doc_key aux lignes de la DB (URLs stockées telles que scrapées).
+    """
+    return db_df.with_columns(
+        canonical_url_expr("url").alias("_canonical")
+    ).with_columns(doc_key_expr("_canonical")).drop("_canonical")
+
+
+def new_documents(docs_df, db_df):
+    """
+    URLs canoniques des documents dont la clé n'est pas encore en DB.
+    """
+    known = with_doc_key(db_df.select("url")).select("doc_key")
+    return set(docs_df.join(known, on="doc_key", how="anti").get_column("url").to_list())
+
+# ----------------------------
+#  Table d'alias (url_aliases.parquet)
+# ----------------------------
+def fetch_aliases():
+    try:
+        body, _ = storage.get(ALIAS_FILENAME)
+    except ObjectNotFound:
+        return pl.DataFrame(schema=ALIAS_SCHEMA)
+    return pl.read_parquet(io.BytesIO(body))
+
+
+def update_aliases(aliases_df, log=print):
+    """
+    Ajoute les alias jamais vus. Table cumulative, reconstructible depuis la DB
+    et les scrapes : une écriture simple (non conditionnelle) suffit. Les clés
+    des alias existants sont recalculées (format de doc_key modifié depuis).
+    """
+    stored = fetch_aliases()
+    existing = stored.with_columns(doc_key_expr("canonical_url"))
+    fresh = aliases_df.join(existing.select("alias_url"), on="alias_url", how="anti")
+    if fresh.is_empty() and existing["doc_key"].equals(stored["doc_key"]):
+        return existing
+    merged = pl.concat([existing, fresh.select(list(ALIAS_SCHEMA))], how="vertical")
+    buffer = io.BytesIO()
+    merged.write_parquet(buffer)
+    storage.put(ALIAS_FILENAME, buffer.getvalue())
+    log(f"[ALIAS] {fresh.height} nouvelles URLs observées ({merged.height} au total)")
+    return merged
+
+# ----------------------------
+#  Rapport : doublons dans la DB existante
+# ----------------------------
+def redundancy_report(db_df, log=print):
+    """
+    Documents présents sous plusieurs URLs dans la DB, et téléchargements
+    redondants que la déduplication par doc_key évite désormais.
+    """
+    groups = (
+        with_doc_key(db_df)
+          .group_by("doc_key")
+          .agg(
+              pl.len().alias("rows"),
+              pl.col("downloaded").sum().alias("downloads"),
+              pl.col("url"),
+          )
+          .filter(pl.col("rows") > 1)
+          .sort("rows", descending=True)
+    )
+    redundant_rows = int(groups["rows"].sum() - groups.height) if groups.height else 0
+    redundant_downloads = int((groups["downloads"].cast(pl.Int64) - 1).clip(lower_bound=0).sum()) if groups.height else 0
+
+    log(f"{db_df.height} lignes, {with_doc_key(db_df.select('url'))['doc_key'].n_unique()} documents distincts")
+    log(f"{groups.height} documents présents sous plusieurs URLs ({redundant_rows} lignes en trop)")
+    log(f"Téléchargements redondants évités : {redundant_downloads}")
+    for row in groups.head(10).iter_rows(named=True):
+        log(f"  - {row['doc_key']} ({row['rows']} URLs) : {', '.join(row['url'])}")
+    return groups
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="URLs canoniques et table d'alias.")
+    parser.add_argument("command", choices=["report", "seed-aliases"],
+                        help="report : doublons dans la DB ; seed-aliases : initialise la table d'alias depuis la DB")
+    args = parser.parse_args()
+
+    db_df, _ = fetch_db()
+    if args.command == "report":
+        redundancy_report(db_df)
+    else:
+        _, aliases = canonical_frame(db_df.select(["url", "provenance"]))
+        update_aliases(aliases)
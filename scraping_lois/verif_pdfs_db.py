@@ -1,15 +1,18 @@
 import os
 import polars as pl
-import boto3
 from dotenv import load_dotenv
 from PyPDF2 import PdfReader
-from botocore.exceptions import ClientError
 from datetime import datetime
 import io
 import warnings
 import tempfile
 import shutil
 
+from db_store import storage, fetch_db, commit_db
+from storage import ObjectNotFound
+from profiling import profile_stage, upload_profiles
+from pdf_catalog import pdf_metadata, catalog_row, upsert_catalog
+
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 
 load_dotenv()
@@ -19,22 +22,6 @@ LOG_VERIF_DIR = os.path.join(TEMP_DIR, "verif_db_logs")
 
 os.makedirs(LOG_VERIF_DIR, exist_ok=True)
 
-DB_TEMP_PATH = os.path.join(TEMP_DIR, "db_urls.parquet.tmp")
-DB_FILENAME = "db_urls.parquet"
-
-BUCKET_NAME = os.getenv("BUCKET_NAME")
-ENDPOINT_URL = os.getenv("R2_ENDPOINT_URL")
-ACCESS_KEY = os.getenv("R2_ACCESS_KEY_ID")
-SECRET_KEY = os.getenv("R2_SECRET_ACCESS_KEY")
-
-s3 = boto3.client(
-    's3',
-    endpoint_url=ENDPOINT_URL,
-    aws_access_key_id=ACCESS_KEY,
-    aws_secret_access_key=SECRET_KEY,
-    verify=False
-)
-
 logfile = os.path.join(LOG_VERIF_DIR, f"pdf_verification_{datetime.now().strftime('%Y-%m-%d_%H-%M')}.log")
 
 def log(message: str):
@@ -48,7 +35,7 @@ def log(message: str):
 def verify_pdf_readability(pdf_stream, pdf_name):
     """
     Vérifie si un PDF peut être ouvert et lu
-    Retourne: (is_readable: bool, error_message: str)
+    Retourne: (is_readable: bool, error_message: str, metadata: dict | None)
     """
     try:
         pdf_reader = PdfReader(pdf_stream)
@@ -57,9 +44,9 @@ def verify_pdf_readability(pdf_stream, pdf_name):
         if num_pages > 0:
             _ = pdf_reader.pages[0].extract_text()
         
-        return True, None
+        return True, None, pdf_metadata(pdf_reader, pdf_stream.getbuffer().nbytes)
     except Exception as e:
-        return False, str(e)
+        return False, str(e), None
 
 def check_all_pdfs_on_cloud():
     """
@@ -70,13 +57,13 @@ def check_all_pdfs_on_cloud():
     log("="*50)
     
     corrupted_urls = []
+    catalog_rows = []
     readable_count = 0
     total_checked = 0
     
     try:
         log("📥 Téléchargement de la DB...")
-        s3.download_file(BUCKET_NAME, DB_FILENAME, DB_TEMP_PATH)
-        df = pl.read_parquet(DB_TEMP_PATH)
+        df, db_etag = fetch_db(log)
     
         
         cloud_keys = (
@@ -97,34 +84,40 @@ def check_all_pdfs_on_cloud():
             url = row["url"]
             
             try:
-                pdf_obj = s3.get_object(Bucket=BUCKET_NAME, Key=cloud_key)
-                pdf_stream = io.BytesIO(pdf_obj['Body'].read())
+                pdf_bytes, pdf_etag = storage.get(cloud_key)
+                pdf_stream = io.BytesIO(pdf_bytes)
                 
-                is_readable, error_msg = verify_pdf_readability(pdf_stream, pdf_name)
+                is_readable, error_msg, metadata = verify_pdf_readability(pdf_stream, pdf_name)
                 
                 total_checked += 1
                 
                 if is_readable:
                     readable_count += 1
+                    catalog_rows.append(catalog_row(pdf_name, pdf_etag.strip('"'), metadata))
                     log(f"[{idx}/{total_pdfs}] ✅ {pdf_name}")
                 else:
                     corrupted_urls.append(url)
                     log(f"[{idx}/{total_pdfs}] ❌ {pdf_name} — ERREUR: {error_msg}")
                 
-            except ClientError as e:
-                log(f"[{idx}/{total_pdfs}] ⚠️ {pdf_name} — ERREUR CLOUD: {e}")
+            except ObjectNotFound as e:
+                log(f"[{idx}/{total_pdfs}] ⚠️ {pdf_name} — ERREUR CLOUD: absent ({e})")
                 corrupted_urls.append(url)
             except Exception as e:
                 log(f"[{idx}/{total_pdfs}] ⚠️ {pdf_name} — ERREUR INCONNUE: {e}")
                 corrupted_urls.append(url)
         
         log("\n📝 Mise à jour de la DB...")
-        df = df.with_columns(
-            pl.when(pl.col("url").is_in(corrupted_urls))
-              .then(True)
-              .otherwise(pl.col("is_corrupted"))
-              .alias("is_corrupted")
-        )
+
+        def mark_corrupted(base_df):
+            return base_df.with_columns(
+                pl.when(pl.col("url").is_in(corrupted_urls))
+                  .then(True)
+                  .otherwise(pl.col("is_corrupted"))
+                  .alias("is_corrupted")
+            )
+
+        df_before_update = df
+        df = mark_corrupted(df)
         
         corrupted_count = len(corrupted_urls)
         
@@ -147,16 +140,16 @@ def check_all_pdfs_on_cloud():
         else:
             log("\n🎉 Tous les PDFs sont lisibles!")
         
-        df.write_parquet(DB_TEMP_PATH)
-        log("\n💾 DB mise à jour localement")
-        
-        log("☁️ Upload de la DB vers Scaleway...")
-        s3.upload_file(DB_TEMP_PATH, BUCKET_NAME, DB_FILENAME)
+        log("☁️ Upload de la DB vers Scaleway (écriture conditionnelle)...")
+        commit_db(mark_corrupted, log, base=(df_before_update, db_etag))
         log("✅ DB synchronisée sur le Cloud")
+
+        log("📇 Mise à jour du catalogue des métadonnées PDF...")
+        upsert_catalog(catalog_rows, log)
         
         log("\n☁️ Upload du log...")
         log_name = os.path.basename(logfile)
-        s3.upload_file(logfile, BUCKET_NAME, f"pdfs-assemblee-nationale/logs/verif_db/{log_name}")
+        storage.upload_file(logfile, f"pdfs-assemblee-nationale/logs/verif_db/{log_name}")
         log("✅ Log uploadé sur Scaleway")
         
         log("\n" + "="*50)
@@ -170,10 +163,6 @@ def check_all_pdfs_on_cloud():
     
     finally:
         try:
-            if os.path.exists(DB_TEMP_PATH):
-                os.remove(DB_TEMP_PATH)
-                print("🗑️ Fichier DB temporaire supprimé")
-            
             if os.path.exists(logfile):
                 os.remove(logfile)
             
@@ -186,4 +175,7 @@ def check_all_pdfs_on_cloud():
             print(f"⚠️ Erreur nettoyage: {e}")
 
 if __name__ == "__main__":
-    check_all_pdfs_on_cloud()
+    # Le log local est supprimé en fin de vérification : on journalise sur stdout.
+    with profile_stage("verif_pdfs", print):
+        check_all_pdfs_on_cloud()
+    upload_profiles("pdfs-assemblee-nationale/logs/verif_db", print)
@@ -0,0 +1,48 @@
+import io
+import os
+import sys
+
+from PyPDF2 import PdfReader
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scraping_lois"))
+
+from pdf_catalog import pdf_metadata  # noqa: E402
+
+
+def _pdf_with_indirect_info():
+    """
+    PDF minimal dont /Title et /CreationDate du dictionnaire /Info sont des
+    objets indirects (cas fréquent des PDF produits par l'Assemblée).
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>",
+        b"<< /Title 5 0 R /Author (Assemblee nationale) /CreationDate 6 0 R >>",
+        b"(Projet de loi de finances)",
+        b"(D:20240115103000+01'00')",
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\n" % (len(objects) + 1))
+    out.write(b"startxref\n%d\n%%%%EOF\n" % xref)
+    return out.getvalue()
+
+
+def test_pdf_metadata_resolves_indirect_objects():
+    data = _pdf_with_indirect_info()
+    meta = pdf_metadata(PdfReader(io.BytesIO(data)), len(data))
+
+    assert meta["n_pages"] == 1
+    assert meta["title"] == "Projet de loi de finances"
+    assert meta["author"] == "Assemblee nationale"
+    assert meta["creation_date"].isoformat() == "2024-01-15T09:30:00+00:00"
+    assert meta["producer"] is None